@@ -17,6 +17,7 @@ import requests
 import json
 
 from config import settings
+from http_probe import probe_session, PROBE_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
@@ -129,10 +130,10 @@ class JanAIProvider(BaseAIProvider):
     async def health_check(self) -> bool:
         """Check Jan AI health"""
         try:
-            response = requests.get(
+            response = probe_session.get(
                 f"{self.base_url}/v1/models",
                 headers={"Authorization": f"Bearer {self.api_key}"},
-                timeout=5
+                timeout=PROBE_TIMEOUT
             )
             return response.status_code == 200
         except Exception as e:
@@ -350,7 +351,7 @@ class OllamaProvider(BaseAIProvider):
     async def health_check(self) -> bool:
         """Check Ollama health"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = probe_session.get(f"{self.base_url}/api/tags", timeout=PROBE_TIMEOUT)
             return response.status_code == 200
         except Exception as e:
             logger.debug(f"Ollama health check failed: {e}")
@@ -619,10 +620,10 @@ class AIServiceManager:
             try:
                 if provider.provider_type == AIProviderType.JAN_AI:
                     # Test Jan AI connection
-                    response = requests.get(
+                    response = probe_session.get(
                         f"{provider.base_url}/v1/models",
                         headers={"Authorization": f"Bearer {provider.api_key}"},
-                        timeout=5
+                        timeout=PROBE_TIMEOUT
                     )
                     if response.status_code == 200:
                         provider.health.status = AIProviderStatus.HEALTHY
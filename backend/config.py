@@ -55,6 +55,13 @@ class Settings(BaseSettings):
         default="sqlite:///./mydoc.db", 
         description="Database URL - will use DATABASE_URL env var if available"
     )
+    db_pool_size: int = Field(20, description="Pooled connections kept open by the database engine")
+    db_max_overflow: int = Field(30, description="Extra connections allowed above the pool size")
+    db_async_pool_size: int = Field(10, description="Pooled connections kept open by the async database engine")
+    db_async_max_overflow: int = Field(10, description="Extra async connections allowed above the pool size")
+    db_pool_timeout: int = Field(30, description="Seconds to wait for a pooled connection")
+    db_pool_recycle: int = Field(3600, description="Seconds before a pooled connection is recycled")
+    db_pool_warmup: int = Field(5, description="Connections opened per pool at startup")
     
     def __init__(self, **kwargs):
         # Override database_url with environment variable if available
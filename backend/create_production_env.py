@@ -153,11 +153,20 @@ REQUEST_TIMEOUT=30
 MAX_CONCURRENT_REQUESTS=1000
 """
             
-            with open(self.env_file, 'w') as f:
-                f.write(env_content)
-            
-            # Set appropriate permissions
-            os.chmod(self.env_file, 0o600)
+            # Write to a sibling temp file created owner-only, then rename it over
+            # the target so a crash never leaves a truncated or world-readable file
+            tmp_file = self.env_file.with_name(self.env_file.name + ".tmp")
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(env_content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_file, 0o600)
+                os.replace(tmp_file, self.env_file)
+            except BaseException:
+                tmp_file.unlink(missing_ok=True)
+                raise
             
             logger.info(f"Production environment file created: {self.env_file}")
             return True
@@ -428,7 +437,7 @@ server {{
 0 4 1 * * find /var/log/mydoc -name "*.log" -mtime +30 -delete
 
 # Backup cleanup (keep 30 days)
-0 5 * * * find /var/backups/mydoc -name "*.sql" -mtime +30 -delete
+0 5 * * * find /var/backups/mydoc -name "mydoc_backup_*" -mtime +30 -delete
 """
             
             logger.info("Cron jobs configuration:")
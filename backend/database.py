@@ -2,13 +2,15 @@
 Database connection and session management for My Dr AI Medical Assistant
 Enhanced with comprehensive error handling, connection pooling, and health monitoring
 """
+import asyncio
 import logging
 import time
-from typing import Generator, Optional, Dict, Any, List
+from typing import AsyncGenerator, Generator, Optional, Dict, Any, List
 from datetime import datetime, timezone
 from sqlalchemy import create_engine, event, text, exc
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool, QueuePool
+from sqlalchemy.pool import StaticPool, QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from contextlib import contextmanager
 from config import settings
 from models import Base
@@ -19,6 +21,34 @@ logger = logging.getLogger(__name__)
 engine = None
 SessionLocal = None
 
+# Asyncio database engine
+async_engine = None
+AsyncSessionLocal = None
+
+
+def configure_database_connection(dbapi_connection, database_url: str):
+    """Set database-specific pragmas and configurations on a new connection"""
+    if database_url.startswith("sqlite"):
+        cursor = dbapi_connection.cursor()
+        # Enhanced SQLite pragmas for medical data integrity
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=FULL")  # Full synchronous for data safety
+        cursor.execute("PRAGMA cache_size=10000")  # Larger cache for better performance
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256MB mmap
+        cursor.execute("PRAGMA optimize")
+        cursor.close()
+        logger.debug("SQLite pragmas configured for medical data integrity")
+    
+    elif database_url.startswith(("postgresql", "postgres://")):
+        # PostgreSQL connection settings
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET timezone TO 'UTC'")
+        cursor.execute("SET statement_timeout = '300s'")  # 5 minute statement timeout
+        cursor.close()
+        logger.debug("PostgreSQL connection configured")
+
 
 def create_database_engine():
     """Create database engine with enhanced configuration and error handling"""
@@ -41,11 +71,12 @@ def create_database_engine():
             engine = create_engine(
                 database_url,
                 poolclass=QueuePool,
-                pool_size=20,  # Increased pool size for medical app
-                max_overflow=30,  # Higher overflow for peak usage
+                pool_size=settings.db_pool_size,  # Increased pool size for medical app
+                max_overflow=settings.db_max_overflow,  # Higher overflow for peak usage
                 pool_pre_ping=True,  # Verify connections before use
-                pool_recycle=3600,  # Recycle connections every hour
-                pool_timeout=30,  # Connection timeout
+                pool_recycle=settings.db_pool_recycle,  # Recycle connections every hour
+                pool_timeout=settings.db_pool_timeout,  # Connection timeout
+                insertmanyvalues_page_size=1000,  # Rows per batched multi-row INSERT
                 echo=settings.debug,
                 echo_pool=settings.debug,
                 # Enhanced PostgreSQL specific settings
@@ -84,26 +115,7 @@ def create_database_engine():
         @event.listens_for(engine, "connect")
         def set_database_pragmas(dbapi_connection, connection_record):
             """Set database-specific pragmas and configurations"""
-            if database_url.startswith("sqlite://"):
-                cursor = dbapi_connection.cursor()
-                # Enhanced SQLite pragmas for medical data integrity
-                cursor.execute("PRAGMA foreign_keys=ON")
-                cursor.execute("PRAGMA journal_mode=WAL")
-                cursor.execute("PRAGMA synchronous=FULL")  # Full synchronous for data safety
-                cursor.execute("PRAGMA cache_size=10000")  # Larger cache for better performance
-                cursor.execute("PRAGMA temp_store=MEMORY")
-                cursor.execute("PRAGMA mmap_size=268435456")  # 256MB mmap
-                cursor.execute("PRAGMA optimize")
-                cursor.close()
-                logger.debug("SQLite pragmas configured for medical data integrity")
-            
-            elif database_url.startswith(("postgresql://", "postgres://")):
-                # PostgreSQL connection settings
-                cursor = dbapi_connection.cursor()
-                cursor.execute("SET timezone TO 'UTC'")
-                cursor.execute("SET statement_timeout = '300s'")  # 5 minute statement timeout
-                cursor.close()
-                logger.debug("PostgreSQL connection configured")
+            configure_database_connection(dbapi_connection, database_url)
         
         @event.listens_for(engine, "checkout")
         def receive_checkout(dbapi_connection, connection_record, connection_proxy):
@@ -164,6 +176,98 @@ def create_session_factory():
     return SessionLocal
 
 
+def get_async_database_url(database_url: str) -> str:
+    """Map a database URL onto the matching asyncio driver"""
+    if database_url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + database_url[len("postgres://"):]
+    if database_url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + database_url[len("postgresql://"):]
+    if database_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + database_url[len("sqlite://"):]
+    return database_url
+
+
+def create_async_database_engine():
+    """Create asyncio database engine mirroring the synchronous configuration"""
+    global async_engine
+    
+    if async_engine is not None:
+        return async_engine
+    
+    database_url = settings.database_url or "sqlite:///./mydoc.db"
+    async_url = get_async_database_url(database_url)
+    
+    try:
+        if async_url.startswith("postgresql+asyncpg://"):
+            async_engine = create_async_engine(
+                async_url,
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=settings.db_async_pool_size,
+                max_overflow=settings.db_async_max_overflow,
+                pool_pre_ping=True,
+                pool_recycle=settings.db_pool_recycle,
+                pool_timeout=settings.db_pool_timeout,
+                insertmanyvalues_page_size=1000,
+                echo=settings.debug,
+                connect_args={
+                    "timeout": 10,
+                    "server_settings": {"application_name": "MyDr_Medical_Assistant"}
+                }
+            )
+        
+        elif async_url.startswith("sqlite+aiosqlite://"):
+            async_engine = create_async_engine(
+                async_url,
+                pool_pre_ping=True,
+                connect_args={
+                    "check_same_thread": False,
+                    "timeout": 20,  # Database lock timeout
+                },
+                echo=settings.debug,
+            )
+        
+        else:
+            async_engine = create_async_engine(
+                async_url,
+                pool_size=10,
+                max_overflow=20,
+                pool_pre_ping=True,
+                echo=settings.debug,
+            )
+        
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def set_async_database_pragmas(dbapi_connection, connection_record):
+            """Set database-specific pragmas and configurations"""
+            configure_database_connection(dbapi_connection, async_url)
+        
+        logger.info(f"Async database engine created: {async_url.split('@')[0] if '@' in async_url else async_url}")
+        
+        return async_engine
+        
+    except Exception as e:
+        logger.error(f"Failed to create async database engine: {e}")
+        raise DatabaseConnectionError(f"Could not create async database engine: {e}")
+
+
+def create_async_session_factory():
+    """Create asyncio session factory"""
+    global AsyncSessionLocal
+    
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal
+    
+    async_engine = create_async_database_engine()
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+    
+    logger.info("Async database session factory created")
+    return AsyncSessionLocal
+
+
 def init_database():
     """Initialize database tables with automatic SQLite fallback"""
     global engine
@@ -202,6 +306,48 @@ def init_database():
         return False
 
 
+def _warmup_connection_count(pool) -> int:
+    """Number of connections to open ahead of traffic for a pool"""
+    size = getattr(pool, 'size', None)
+    if not callable(size):
+        return 1  # StaticPool and friends hold a single connection
+    return max(1, min(settings.db_pool_warmup, size()))
+
+
+def _warm_sync_pool(count: int):
+    """Check out connections together so the pool keeps them all open"""
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def _warm_async_connection():
+    """Open one async pooled connection"""
+    async with create_async_database_engine().connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def warm_database_pools() -> Dict[str, int]:
+    """
+    Open pooled connections at startup so the first requests don't pay the
+    connection setup cost. Call after init_database().
+    """
+    sync_count = _warmup_connection_count(create_database_engine().pool)
+    await asyncio.to_thread(_warm_sync_pool, sync_count)
+    
+    async_count = _warmup_connection_count(create_async_database_engine().pool)
+    await asyncio.gather(*(_warm_async_connection() for _ in range(async_count)))
+    
+    logger.info(f"Warmed database pools - Sync: {sync_count}, Async: {async_count}")
+    return {"sync": sync_count, "async": async_count}
+
+
 def get_db() -> Generator[Session, None, None]:
     """
     Enhanced dependency to get database session with comprehensive error handling
@@ -248,6 +394,45 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Asyncio dependency to get database session with comprehensive error handling
+    Use this in async FastAPI endpoints with Depends(get_async_db)
+    """
+    AsyncSessionLocal = create_async_session_factory()
+    db = AsyncSessionLocal()
+    start_time = time.time()
+    
+    try:
+        yield db
+        
+    except exc.DisconnectionError as e:
+        logger.error(f"Database disconnection error: {e}")
+        await db.rollback()
+        raise DatabaseConnectionError(f"Database connection lost: {e}")
+        
+    except exc.TimeoutError as e:
+        logger.error(f"Database timeout error: {e}")
+        await db.rollback()
+        raise DatabaseTimeoutError(f"Database operation timed out: {e}")
+        
+    except exc.IntegrityError as e:
+        logger.error(f"Database integrity error: {e}")
+        await db.rollback()
+        raise DatabaseIntegrityError(f"Database integrity violation: {e}")
+        
+    except exc.OperationalError as e:
+        logger.error(f"Database operational error: {e}")
+        await db.rollback()
+        raise DatabaseConnectionError(f"Database operational error: {e}")
+        
+    finally:
+        session_duration = time.time() - start_time
+        if session_duration > 5.0:  # Log slow sessions
+            logger.warning(f"Slow database session: {session_duration:.2f}s")
+        await db.close()
+
+
 @contextmanager
 def get_db_session() -> Generator[Session, None, None]:
     """
@@ -538,8 +723,8 @@ class DatabaseManager:
                 "error": str(e)
             }
     
-    def get_database_statistics(self) -> Dict[str, Any]:
-        """Get comprehensive database statistics"""
+    def get_database_statistics(self, exact: bool = True) -> Dict[str, Any]:
+        """Get comprehensive database statistics (exact=False uses PostgreSQL row estimates)"""
         stats = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "table_counts": {},
@@ -549,16 +734,27 @@ class DatabaseManager:
         
         try:
             with self.get_session() as session:
-                # Get table row counts
+                # Get table row counts in a single round-trip
                 tables = ['users', 'conversations', 'messages', 'medical_records', 
                          'consultations', 'health_analytics', 'symptom_patterns']
                 
+                if not exact and self.engine.dialect.name == "postgresql":
+                    # Live tuple estimates from the statistics collector avoid
+                    # a sequential scan per table for COUNT(*)
+                    counts = dict(session.execute(text("""
+                        SELECT relname, n_live_tup FROM pg_stat_user_tables
+                        WHERE schemaname = 'public'
+                    """)).all())
+                else:
+                    from sqlalchemy import inspect
+                    existing_tables = set(inspect(self.engine).get_table_names())
+                    present = [table for table in tables if table in existing_tables]
+                    counts = dict(session.execute(text(" UNION ALL ".join(
+                        f"SELECT '{table}', COUNT(*) FROM {table}" for table in present
+                    ))).all()) if present else {}
+                
                 for table in tables:
-                    try:
-                        count = session.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
-                        stats["table_counts"][table] = count
-                    except Exception:
-                        stats["table_counts"][table] = "N/A"
+                    stats["table_counts"][table] = counts.get(table, "N/A")
                 
                 # Get recent activity (last 24 hours)
                 try:
@@ -754,6 +950,8 @@ class MigrationManager:
     
     def run_initial_migrations(self) -> bool:
         """Run initial database setup migrations"""
+        is_postgresql = self.db_manager.engine.dialect.name == "postgresql"
+        
         migrations = [
             {
                 "version": "001_initial_schema",
@@ -780,6 +978,32 @@ class MigrationManager:
                     "CREATE INDEX IF NOT EXISTS idx_symptom_patterns_user_active ON symptom_patterns(user_id, is_active)",
                     "CREATE INDEX IF NOT EXISTS idx_health_metrics_user_type_measured ON health_metrics(user_id, metric_type, measured_at)",
                 ]
+            },
+            {
+                "version": "004_symptom_record_composite_indexes",
+                "description": "Add covering symptom history indexes",
+                "commands": [
+                    "CREATE INDEX IF NOT EXISTS idx_symptom_record_user_recorded_urgency ON symptom_records(user_id, recorded_at DESC, urgency_level)",
+                    "CREATE INDEX IF NOT EXISTS idx_symptom_record_user_urgency_recorded ON symptom_records(user_id, urgency_level, recorded_at DESC)",
+                    "DROP INDEX IF EXISTS idx_symptom_record_user_recorded",
+                ]
+            },
+            {
+                "version": "005_symptom_record_recorded_brin",
+                "description": "Add BRIN index for symptom record time range scans",
+                # Symptom records are appended in time order, so a BRIN index covers
+                # wide recorded_at ranges at a fraction of a B-tree's size (PostgreSQL only)
+                "commands": [
+                    "CREATE INDEX IF NOT EXISTS idx_symptom_records_recorded_brin ON symptom_records "
+                    "USING BRIN (recorded_at) WITH (pages_per_range = 32)",
+                ] if is_postgresql else []
+            },
+            {
+                "version": "006_conversation_user_last_message",
+                "description": "Add composite index for a user's latest conversation lookup",
+                "commands": [
+                    "CREATE INDEX IF NOT EXISTS idx_conversation_user_last_message ON conversations(user_id, last_message_at DESC)",
+                ]
             }
         ]
         
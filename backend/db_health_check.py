@@ -308,7 +308,7 @@ class DatabaseHealthChecker:
             total_backup_size = 0
             
             for filename in os.listdir(backup_dir):
-                if filename.endswith('.sql'):
+                if filename.endswith(backup_manager.BACKUP_EXTENSIONS):
                     filepath = os.path.join(backup_dir, filename)
                     file_stat = os.stat(filepath)
                     backup_files.append({
@@ -4,9 +4,11 @@ Handles encryption/decryption of sensitive user data
 """
 
 import os
+import atexit
 import base64
 import json
-from typing import Any, Dict, Optional, Union
+import threading
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
@@ -14,6 +16,10 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 import secrets
 
+# Audit log entries are buffered and appended in batches
+AUDIT_LOG_BATCH_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 0.5  # seconds
+
 class EncryptionService:
     """Service for encrypting and decrypting sensitive medical data"""
     
@@ -154,6 +160,9 @@ class AuditLogger:
     
     def __init__(self):
         self.log_file = os.getenv('SECURITY_AUDIT_LOG', 'security_audit.log')
+        self._pending: List[str] = []
+        self._pending_condition = threading.Condition()
+        self._writer_thread: Optional[threading.Thread] = None
     
     def log_access(self, user_id: str, resource: str, action: str, 
                    ip_address: str = None, user_agent: str = None, 
@@ -170,9 +179,43 @@ class AuditLogger:
             'details': details or {}
         }
         
+        self._enqueue(json.dumps(log_entry) + '\n')
+    
+    def _enqueue(self, line: str):
+        """Buffer a log line for the background writer"""
+        with self._pending_condition:
+            self._pending.append(line)
+            
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(
+                    target=self._write_batches, name="audit-log-writer", daemon=True
+                )
+                self._writer_thread.start()
+                # The writer is a daemon thread; write whatever is left on exit
+                atexit.register(self.flush)
+            
+            if len(self._pending) >= AUDIT_LOG_BATCH_SIZE:
+                self._pending_condition.notify()
+    
+    def _write_batches(self):
+        """Append buffered entries every flush interval, or sooner when a batch fills"""
+        while True:
+            with self._pending_condition:
+                if len(self._pending) < AUDIT_LOG_BATCH_SIZE:
+                    self._pending_condition.wait(timeout=AUDIT_LOG_FLUSH_INTERVAL)
+            self.flush()
+    
+    def flush(self):
+        """Write all buffered log entries with a single append"""
+        with self._pending_condition:
+            lines, self._pending = self._pending, []
+        
+        if not lines:
+            return
+        
         try:
             with open(self.log_file, 'a') as f:
-                f.write(json.dumps(log_entry) + '\n')
+                f.writelines(lines)
         except Exception as e:
             print(f"❌ Failed to write audit log: {e}")
     
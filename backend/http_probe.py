@@ -0,0 +1,18 @@
+"""
+Shared HTTP session for AI service health probes
+Keeps the TCP connection alive across checks and retries transient
+connection failures and 502/503/504 responses with a short backoff
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PROBE_TIMEOUT = (1.0, 2.0)  # (connect, read) seconds
+
+_probe_adapter = HTTPAdapter(max_retries=Retry(
+    total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"]
+))
+
+probe_session = requests.Session()
+probe_session.mount("http://", _probe_adapter)
+probe_session.mount("https://", _probe_adapter)
@@ -7,6 +7,7 @@ import json
 import logging
 from typing import Optional, Dict, Any
 from config import settings
+from http_probe import probe_session, PROBE_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +54,7 @@ Always maintain a professional, caring, and informative tone. Use clear, underst
     def check_ollama_connection(self) -> bool:
         """Check if Ollama is running and accessible"""
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            response = probe_session.get("http://localhost:11434/api/tags", timeout=PROBE_TIMEOUT)
             return response.status_code == 200
         except Exception as e:
             logger.debug(f"Ollama not accessible: {e}")
@@ -62,10 +63,10 @@ Always maintain a professional, caring, and informative tone. Use clear, underst
     def check_jan_connection(self) -> bool:
         """Check if Jan AI is running and accessible"""
         try:
-            response = requests.get(
+            response = probe_session.get(
                 f"{settings.jan_url}/v1/models", 
                 headers={"Authorization": f"Bearer {self.jan_api_key}"},
-                timeout=5
+                timeout=PROBE_TIMEOUT
             )
             return response.status_code == 200
         except Exception as e:
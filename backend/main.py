@@ -72,6 +72,13 @@ async def lifespan(app: FastAPI):
         print(f"❌ Database error: {e}")
         raise RuntimeError(f"Database startup failed: {e}")
     
+    # Open pooled connections before the first request arrives
+    try:
+        from database import warm_database_pools
+        await warm_database_pools()
+    except Exception as e:
+        print(f"⚠️  Database pool warmup failed: {e}, connections will open on demand...")
+    
     # Run startup validation
     try:
         from startup import startup_application
@@ -84,6 +91,17 @@ async def lifespan(app: FastAPI):
         print(f"❌ Startup error: {e}")
         raise
     
+    # Start batched symptom history writer and load the demo user once
+    symptom_writer_task = asyncio.create_task(symptom_record_writer())
+    try:
+        await warm_demo_user_cache()
+    except Exception as e:
+        print(f"⚠️  Demo user cache warmup failed: {e}, will load on first request...")
+    try:
+        check_symptom_analyzer()
+    except Exception as e:
+        print(f"⚠️  Symptom analyzer canary failed: {e}")
+    
     print(f"Environment: {settings.environment.value}")
     print(f"Debug mode: {settings.debug}")
     allowed_origins = [origin.strip() for origin in settings.allowed_origins.split(',') if origin.strip()]
@@ -95,6 +113,9 @@ async def lifespan(app: FastAPI):
     # Shutdown
     print("👋 MyDoc backend shutting down...")
     
+    # Stop the symptom history writer, flushing pending records
+    await stop_symptom_record_writer(symptom_writer_task)
+    
     # Shutdown monitoring system
     try:
         await shutdown_monitoring_system()
@@ -144,7 +165,10 @@ app.include_router(conversation_router)
 app.include_router(monitoring_router)
 
 # Include symptom checker API
-from symptom_api import router as symptom_router
+from symptom_api import (
+    router as symptom_router, symptom_record_writer, stop_symptom_record_writer,
+    warm_demo_user_cache, check_symptom_analyzer
+)
 app.include_router(symptom_router)
 
 # Include health monitoring API
@@ -1398,8 +1422,8 @@ async def get_websocket_status():
         from websocket_manager import connection_manager
         return {
             "active_users": connection_manager.get_active_users(),
-            "total_connections": sum(len(connections) for connections in connection_manager.active_connections.values()),
-            "active_conversations": list(connection_manager.conversation_subscriptions.keys()),
+            "total_connections": connection_manager.get_connection_count(),
+            "active_conversations": connection_manager.get_active_conversations(),
             "typing_indicators": {
                 conv_id: list(users.keys()) 
                 for conv_id, users in connection_manager.typing_indicators.items()
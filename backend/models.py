@@ -5,9 +5,10 @@ from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any
 from sqlalchemy import (
     Column, Integer, String, Float, DateTime, Text, JSON, 
-    ForeignKey, Boolean, Index, UniqueConstraint
+    ForeignKey, Boolean, Index, UniqueConstraint, and_, case, cast
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship, Session
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -179,6 +180,43 @@ class User(Base):
         else:
             return self.email.split('@')[0]
     
+    @hybrid_property
+    def profile_completion(self) -> float:
+        """Percentage of optional profile fields the user has filled in"""
+        profile_fields = [
+            self.display_name,
+            self.phone_number,
+            self.date_of_birth,
+            self.gender,
+            self.emergency_contact,
+            self.medical_info
+        ]
+        completed_fields = sum(1 for field in profile_fields if field)
+        return (completed_fields / len(profile_fields)) * 100
+    
+    @profile_completion.expression
+    def profile_completion(cls):
+        """SQL form of profile_completion, so it can be selected without loading the user"""
+        def filled_text(column):
+            return case((and_(column.is_not(None), column != ''), 1), else_=0)
+        
+        def filled_json(column):
+            # JSON columns store an empty value as JSON null or an empty container
+            return case((and_(
+                column.is_not(None),
+                cast(column, String).not_in(['null', '{}', '[]', '""'])
+            ), 1), else_=0)
+        
+        completed_fields = (
+            filled_text(cls.display_name)
+            + filled_text(cls.phone_number)
+            + filled_text(cls.date_of_birth)
+            + filled_text(cls.gender)
+            + filled_json(cls.emergency_contact)
+            + filled_json(cls.medical_info)
+        )
+        return completed_fields * 100.0 / 6
+    
     def get_age(self) -> Optional[int]:
         """Calculate user's age from date of birth"""
         if not self.date_of_birth:
@@ -263,13 +301,42 @@ class User(Base):
         
         return value
     
-    def encrypt_sensitive_data(self):
-        """Encrypt sensitive user data"""
+    def _encrypt_field(self, field_name: str, value: Any) -> str:
+        """Encrypt a sensitive field value, remembering its plaintext for this instance"""
+        from encryption_service import encryption_service
+        
+        encrypted_value = encryption_service.encrypt_data(value)
+        self._decrypted_cache[field_name] = (encrypted_value, value)
+        return encrypted_value
+    
+    def _decrypt_field(self, field_name: str, encrypted_value: str) -> Any:
+        """Decrypt a sensitive field value, reusing the result while the ciphertext is unchanged"""
         from encryption_service import encryption_service
         
+        cached = self._decrypted_cache.get(field_name)
+        if cached is not None and cached[0] == encrypted_value:
+            return cached[1]
+        
+        try:
+            value = encryption_service.decrypt_data(encrypted_value)
+        except Exception:
+            value = None
+        self._decrypted_cache[field_name] = (encrypted_value, value)
+        return value
+    
+    @property
+    def _decrypted_cache(self) -> Dict[str, Any]:
+        """Per-instance plaintext cache keyed by field name, valid for the matching ciphertext"""
+        cache = self.__dict__.get('_decrypted_values')
+        if cache is None:
+            cache = self.__dict__['_decrypted_values'] = {}
+        return cache
+    
+    def encrypt_sensitive_data(self):
+        """Encrypt sensitive user data"""
         # Encrypt phone number if not already encrypted
         if self.phone_number and not self.phone_encrypted:
-            self.phone_number = encryption_service.encrypt_data(self.phone_number)
+            self.phone_number = self._encrypt_field('phone', self.phone_number)
             self.phone_encrypted = True
         
         # Encrypt date of birth if not already encrypted
@@ -278,59 +345,44 @@ class User(Base):
                 date_str = self.date_of_birth.isoformat()
             else:
                 date_str = str(self.date_of_birth)
-            self.date_of_birth = encryption_service.encrypt_data(date_str)
+            self.date_of_birth = self._encrypt_field('date_of_birth', date_str)
             self.date_of_birth_encrypted = True
         
         # Encrypt emergency contact if not already encrypted
         if self.emergency_contact and not self.emergency_contact_encrypted:
-            self.emergency_contact = encryption_service.encrypt_data(self.emergency_contact)
+            self.emergency_contact = self._encrypt_field('emergency_contact', self.emergency_contact)
             self.emergency_contact_encrypted = True
         
         # Encrypt medical info if not already encrypted
         if self.medical_info and not self.medical_info_encrypted:
-            self.medical_info = encryption_service.encrypt_data(self.medical_info)
+            self.medical_info = self._encrypt_field('medical_info', self.medical_info)
             self.medical_info_encrypted = True
     
     def decrypt_sensitive_data(self):
         """Decrypt sensitive user data for display"""
-        from encryption_service import encryption_service
-        
         decrypted_data = {}
         
         # Decrypt phone number
         if self.phone_number and self.phone_encrypted:
-            try:
-                decrypted_data['phone'] = encryption_service.decrypt_data(self.phone_number)
-            except Exception:
-                decrypted_data['phone'] = None
+            decrypted_data['phone'] = self._decrypt_field('phone', self.phone_number)
         else:
             decrypted_data['phone'] = self.phone_number
         
         # Decrypt date of birth
         if self.date_of_birth and self.date_of_birth_encrypted:
-            try:
-                date_str = encryption_service.decrypt_data(self.date_of_birth)
-                decrypted_data['date_of_birth'] = date_str
-            except Exception:
-                decrypted_data['date_of_birth'] = None
+            decrypted_data['date_of_birth'] = self._decrypt_field('date_of_birth', self.date_of_birth)
         else:
             decrypted_data['date_of_birth'] = self.date_of_birth
         
         # Decrypt emergency contact
         if self.emergency_contact and self.emergency_contact_encrypted:
-            try:
-                decrypted_data['emergency_contact'] = encryption_service.decrypt_data(self.emergency_contact)
-            except Exception:
-                decrypted_data['emergency_contact'] = None
+            decrypted_data['emergency_contact'] = self._decrypt_field('emergency_contact', self.emergency_contact)
         else:
             decrypted_data['emergency_contact'] = self.emergency_contact
         
         # Decrypt medical info
         if self.medical_info and self.medical_info_encrypted:
-            try:
-                decrypted_data['medical_info'] = encryption_service.decrypt_data(self.medical_info)
-            except Exception:
-                decrypted_data['medical_info'] = None
+            decrypted_data['medical_info'] = self._decrypt_field('medical_info', self.medical_info)
         else:
             decrypted_data['medical_info'] = self.medical_info
         
@@ -600,6 +652,7 @@ class Conversation(Base):
         Index('idx_conversation_type_urgency', 'consultation_type', 'urgency_level'),
         Index('idx_conversation_started_at', 'started_at'),
         Index('idx_conversation_last_message', 'last_message_at'),
+        Index('idx_conversation_user_last_message', user_id, last_message_at.desc()),
         Index('idx_conversation_archived', 'is_archived'),
         Index('idx_conversation_emergency', 'emergency_detected'),
     )
@@ -1536,7 +1589,9 @@ class SymptomRecord(Base):
     
     # Indexes
     __table_args__ = (
-        Index('idx_symptom_record_user_recorded', 'user_id', 'recorded_at'),
+        # Covering index for per-user history/insights ordered by newest first
+        Index('idx_symptom_record_user_recorded_urgency', user_id, recorded_at.desc(), urgency_level),
+        Index('idx_symptom_record_user_urgency_recorded', user_id, urgency_level, recorded_at.desc()),
         Index('idx_symptom_record_urgency', 'urgency_level'),
         Index('idx_symptom_record_follow_up', 'requires_follow_up'),
     )
@@ -7,6 +7,10 @@ import logging
 import asyncio
 import time
 import json
+import gzip
+import shutil
+import tempfile
+import threading
 import subprocess
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timezone, timedelta
@@ -535,9 +539,54 @@ class ProductionDatabaseManager:
 class DatabaseBackupManager:
     """Comprehensive database backup and recovery system"""
     
+    # Plain dumps from older releases are still recognised for restore/cleanup
+    BACKUP_EXTENSIONS = (".dump", ".sql.gz", ".sql")
+    RESTORE_JOBS = max(1, min(os.cpu_count() or 1, 8))
+    BACKUP_TIMEOUT_SECONDS = 3600
+    COPY_CHUNK_SIZE = 1 << 20
+    
     def __init__(self, config: DatabaseConfig):
         self.config = config
         self.backup_dir = os.getenv("DB_BACKUP_DIR", "/var/backups/mydoc")
+    
+    def _run_streaming(self, cmd: List[str], env: Dict[str, str], source=None) -> Tuple[int, str]:
+        """Run a command, streaming source (if given) into its stdin.
+        
+        Data is copied in fixed-size chunks, so memory use does not grow with the
+        size of the dump. Raises subprocess.TimeoutExpired if the command outlives
+        BACKUP_TIMEOUT_SECONDS.
+        """
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(
+                cmd,
+                env=env,
+                stdin=subprocess.PIPE if source is not None else subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr_file
+            )
+            timer = threading.Timer(self.BACKUP_TIMEOUT_SECONDS, process.kill)
+            timer.start()
+            try:
+                if source is not None:
+                    try:
+                        shutil.copyfileobj(source, process.stdin, self.COPY_CHUNK_SIZE)
+                    except BrokenPipeError:
+                        pass
+                    finally:
+                        process.stdin.close()
+                returncode = process.wait()
+            finally:
+                timed_out = timer.finished.is_set()
+                timer.cancel()
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+            
+            if timed_out:
+                raise subprocess.TimeoutExpired(cmd, self.BACKUP_TIMEOUT_SECONDS)
+            
+            stderr_file.seek(0)
+            return returncode, stderr_file.read().decode("utf-8", errors="replace")
         
     def create_backup(self, backup_type: str = "full") -> Dict[str, Any]:
         """Create database backup using pg_dump"""
@@ -557,7 +606,7 @@ class DatabaseBackupManager:
             
             # Generate backup filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"mydoc_backup_{backup_type}_{timestamp}.sql"
+            backup_filename = f"mydoc_backup_{backup_type}_{timestamp}.dump"
             backup_path = os.path.join(self.backup_dir, backup_filename)
             
             start_time = time.time()
@@ -573,7 +622,8 @@ class DatabaseBackupManager:
                 "-U", self.config.username,
                 "-d", self.config.database,
                 "-f", backup_path,
-                "--verbose",
+                "--format=custom",
+                "--compress=3",
                 "--no-password"
             ]
             
@@ -582,18 +632,18 @@ class DatabaseBackupManager:
             elif backup_type == "data_only":
                 cmd.append("--data-only")
             
-            # Execute backup
-            result = subprocess.run(
-                cmd,
-                env=env,
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1 hour timeout
-            )
+            # Execute backup; the custom format is compressed by pg_dump itself
+            # and can be restored in parallel with pg_restore --jobs
+            try:
+                returncode, stderr = self._run_streaming(cmd, env)
+            except BaseException:
+                if os.path.exists(backup_path):
+                    os.remove(backup_path)
+                raise
             
             duration = time.time() - start_time
             
-            if result.returncode == 0:
+            if returncode == 0:
                 backup_result["status"] = "success"
                 backup_result["backup_file"] = backup_path
                 backup_result["size_bytes"] = os.path.getsize(backup_path)
@@ -601,9 +651,11 @@ class DatabaseBackupManager:
                 
                 logger.info(f"Database backup created successfully: {backup_path}")
             else:
+                if os.path.exists(backup_path):
+                    os.remove(backup_path)
                 backup_result["status"] = "failed"
-                backup_result["error"] = result.stderr
-                logger.error(f"Database backup failed: {result.stderr}")
+                backup_result["error"] = stderr
+                logger.error(f"Database backup failed: {stderr}")
                 
         except subprocess.TimeoutExpired:
             backup_result["status"] = "timeout"
@@ -633,39 +685,38 @@ class DatabaseBackupManager:
             
             start_time = time.time()
             
-            # Prepare psql command for restore
+            # Prepare restore command: pg_restore for custom-format dumps,
+            # psql for plain SQL dumps from older releases
             env = os.environ.copy()
             env["PGPASSWORD"] = self.config.password
             
-            cmd = [
-                "psql",
+            connection_args = [
                 "-h", self.config.host,
                 "-p", str(self.config.port),
                 "-U", self.config.username,
                 "-d", self.config.database,
-                "-f", backup_file,
                 "--no-password"
             ]
             
-            # Execute restore
-            result = subprocess.run(
-                cmd,
-                env=env,
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1 hour timeout
-            )
+            # Execute restore; gzip-compressed SQL dumps are decompressed on the fly
+            if backup_file.endswith(".dump"):
+                cmd = ["pg_restore", *connection_args, "--jobs", str(self.RESTORE_JOBS), backup_file]
+                returncode, stderr = self._run_streaming(cmd, env)
+            else:
+                opener = gzip.open if backup_file.endswith(".gz") else open
+                with opener(backup_file, "rb") as backup_in:
+                    returncode, stderr = self._run_streaming(["psql", *connection_args], env, source=backup_in)
             
             duration = time.time() - start_time
             
-            if result.returncode == 0:
+            if returncode == 0:
                 restore_result["status"] = "success"
                 restore_result["duration_seconds"] = round(duration, 2)
                 logger.info(f"Database restored successfully from: {backup_file}")
             else:
                 restore_result["status"] = "failed"
-                restore_result["error"] = result.stderr
-                logger.error(f"Database restore failed: {result.stderr}")
+                restore_result["error"] = stderr
+                logger.error(f"Database restore failed: {stderr}")
                 
         except Exception as e:
             restore_result["status"] = "failed"
@@ -716,7 +767,7 @@ class DatabaseBackupManager:
             total_freed = 0
             
             for filename in os.listdir(self.backup_dir):
-                if filename.startswith("mydoc_backup_") and filename.endswith(".sql"):
+                if filename.startswith("mydoc_backup_") and filename.endswith(self.BACKUP_EXTENSIONS):
                     file_path = os.path.join(self.backup_dir, filename)
                     file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
                     
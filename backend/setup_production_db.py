@@ -213,9 +213,11 @@ class ProductionDatabaseSetup:
             
             # Get backup schedule configuration
             schedule_config = backup_manager.schedule_automated_backups()
-            logger.info("Automated backup schedule configuration:")
-            for backup_type, config in schedule_config["cron_configuration"].items():
-                logger.info(f"  {backup_type}: {config['schedule']}")
+            schedule_lines = ["Automated backup schedule configuration:"] + [
+                f"  {backup_type}: {config['schedule']}"
+                for backup_type, config in schedule_config["cron_configuration"].items()
+            ]
+            logger.info("\n".join(schedule_lines))
             
             self.setup_results["steps_completed"].append("backup_system_setup")
             return True
@@ -332,16 +334,20 @@ class ProductionDatabaseSetup:
         # Generate final report
         report = self.generate_setup_report()
         
-        logger.info("=" * 60)
-        logger.info("PRODUCTION DATABASE SETUP COMPLETE")
-        logger.info("=" * 60)
-        logger.info(f"Success: {report['success']}")
-        logger.info(f"Steps completed: {report['total_steps']}")
-        logger.info(f"Errors: {len(report['errors'])}")
-        logger.info(f"Warnings: {len(report['warnings'])}")
+        summary_lines = [
+            "=" * 60,
+            "PRODUCTION DATABASE SETUP COMPLETE",
+            "=" * 60,
+            f"Success: {report['success']}",
+            f"Steps completed: {report['total_steps']}",
+            f"Errors: {len(report['errors'])}",
+            f"Warnings: {len(report['warnings'])}"
+        ]
         
         if report.get("final_health_check", {}).get("status"):
-            logger.info(f"Final health status: {report['final_health_check']['status']}")
+            summary_lines.append(f"Final health status: {report['final_health_check']['status']}")
+        
+        logger.info("\n".join(summary_lines))
         
         # Save report to file
         import json
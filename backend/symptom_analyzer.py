@@ -10,14 +10,20 @@ This module provides comprehensive symptom analysis capabilities including:
 
 import re
 import json
+import heapq
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime, timedelta
+from collections import defaultdict
+from operator import itemgetter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Word tokens for red flag matching; normalized symptoms keep "-" and "/" joins
+_WORD_RE = re.compile(r"\w+")
+
 
 class UrgencyLevel(Enum):
     """Urgency levels for medical situations"""
@@ -89,6 +95,9 @@ class SymptomAnalyzer:
         self.symptom_patterns = self._load_symptom_patterns()
         self.condition_database = self._load_condition_database()
         self.red_flag_indicators = self._load_red_flag_indicators()
+        self._condition_vocab, self._condition_masks = self._build_condition_bitsets()
+        self._pattern_red_flags = self._build_pattern_red_flags()
+        self._token_to_indicators = self._build_red_flag_index()
         
     def _load_emergency_keywords(self) -> Dict[str, int]:
         """Load emergency keywords with urgency scores"""
@@ -258,6 +267,44 @@ class SymptomAnalyzer:
             "severe dehydration"
         ]
     
+    def _build_condition_bitsets(self) -> Tuple[List[str], Dict[str, int]]:
+        """Pack each condition's symptoms into an int bitset over a shared vocabulary"""
+        vocab_index: Dict[str, int] = {}
+        condition_masks: Dict[str, int] = {}
+        
+        for condition_id, condition_data in self.condition_database.items():
+            mask = 0
+            for condition_symptom in condition_data["symptoms"]:
+                bit = vocab_index.setdefault(condition_symptom.lower(), len(vocab_index))
+                mask |= 1 << bit
+            condition_masks[condition_id] = mask
+        
+        return list(vocab_index), condition_masks
+    
+    def _build_pattern_red_flags(self) -> List[Tuple[str, str]]:
+        """Pair each category red flag with its lowercased form"""
+        return [
+            (red_flag, red_flag.lower())
+            for pattern_data in self.symptom_patterns.values()
+            for red_flag in pattern_data.get("red_flags", [])
+        ]
+    
+    def _build_red_flag_index(self) -> Dict[str, List[str]]:
+        """Build an inverted index from word to the red flag indicators containing it"""
+        token_to_indicators: Dict[str, List[str]] = defaultdict(list)
+        for indicator in self.red_flag_indicators:
+            for token in dict.fromkeys(_WORD_RE.findall(indicator.lower())):
+                token_to_indicators[token].append(indicator)
+        return dict(token_to_indicators)
+    
+    def _symptom_vocab_mask(self, symptom_lower: str) -> int:
+        """Bitset of condition-vocabulary entries that match a normalized symptom"""
+        mask = 0
+        for bit, condition_symptom in enumerate(self._condition_vocab):
+            if condition_symptom in symptom_lower or symptom_lower in condition_symptom:
+                mask |= 1 << bit
+        return mask
+    
     def analyze_symptoms(self, symptom_input: SymptomInput) -> SymptomAnalysis:
         """
         Perform comprehensive symptom analysis
@@ -269,55 +316,70 @@ class SymptomAnalyzer:
             SymptomAnalysis object with complete analysis results
         """
         try:
-            # Calculate urgency score
-            urgency_score = self._calculate_urgency_score(symptom_input)
-            
-            # Determine urgency level
-            urgency_level = self._determine_urgency_level(urgency_score)
-            
-            # Determine severity level
-            severity_level = self._determine_severity_level(symptom_input, urgency_score)
-            
-            # Identify red flags
-            red_flags = self._identify_red_flags(symptom_input)
-            
-            # Generate condition suggestions
-            possible_conditions = self._suggest_conditions(symptom_input, urgency_score)
-            
-            # Generate recommendations
-            recommendations = self._generate_recommendations(symptom_input, urgency_score, urgency_level)
-            
-            # Generate follow-up questions
-            follow_up_questions = self._generate_follow_up_questions(symptom_input)
-            
-            # Identify emergency indicators
-            emergency_indicators = self._identify_emergency_indicators(symptom_input)
-            
-            # Calculate overall confidence
-            confidence_score = self._calculate_confidence_score(symptom_input, possible_conditions)
-            
-            # Determine if immediate attention is required
-            requires_immediate_attention = urgency_score >= 8 or len(red_flags) > 0
-            
-            return SymptomAnalysis(
-                urgency_score=urgency_score,
-                urgency_level=urgency_level,
-                severity_level=severity_level,
-                primary_symptoms=symptom_input.symptoms[:3],  # Top 3 symptoms
-                red_flags=red_flags,
-                possible_conditions=possible_conditions,
-                recommendations=recommendations,
-                follow_up_questions=follow_up_questions,
-                emergency_indicators=emergency_indicators,
-                confidence_score=confidence_score,
-                analysis_timestamp=datetime.utcnow(),
-                requires_immediate_attention=requires_immediate_attention
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in symptom analysis: {e}")
+            self._validate_symptom_input(symptom_input)
+        except ValueError as e:
+            logger.error(f"Invalid symptom input: {e}")
             # Return safe default analysis
             return self._create_safe_default_analysis(symptom_input)
+        
+        # Calculate urgency score
+        urgency_score = self._calculate_urgency_score(symptom_input)
+        
+        # Determine urgency level
+        urgency_level = self._determine_urgency_level(urgency_score)
+        
+        # Determine severity level
+        severity_level = self._determine_severity_level(symptom_input, urgency_score)
+        
+        # Identify red flags
+        red_flags = self._identify_red_flags(symptom_input)
+        
+        # Generate condition suggestions
+        possible_conditions = self._suggest_conditions(symptom_input, urgency_score)
+        
+        # Generate recommendations
+        recommendations = self._generate_recommendations(symptom_input, urgency_score, urgency_level)
+        
+        # Generate follow-up questions
+        follow_up_questions = self._generate_follow_up_questions(symptom_input)
+        
+        # Identify emergency indicators
+        emergency_indicators = self._identify_emergency_indicators(symptom_input)
+        
+        # Calculate overall confidence
+        confidence_score = self._calculate_confidence_score(symptom_input, possible_conditions)
+        
+        # Determine if immediate attention is required
+        requires_immediate_attention = urgency_score >= 8 or len(red_flags) > 0
+        
+        return SymptomAnalysis(
+            urgency_score=urgency_score,
+            urgency_level=urgency_level,
+            severity_level=severity_level,
+            primary_symptoms=symptom_input.symptoms[:3],  # Top 3 symptoms
+            red_flags=red_flags,
+            possible_conditions=possible_conditions,
+            recommendations=recommendations,
+            follow_up_questions=follow_up_questions,
+            emergency_indicators=emergency_indicators,
+            confidence_score=confidence_score,
+            analysis_timestamp=datetime.utcnow(),
+            requires_immediate_attention=requires_immediate_attention
+        )
+    
+    def _validate_symptom_input(self, symptom_input: SymptomInput) -> None:
+        """Reject input the analysis helpers cannot process"""
+        for field_name in ("symptoms", "associated_symptoms"):
+            values = getattr(symptom_input, field_name)
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                raise ValueError(f"{field_name} must be a list of strings")
+        
+        if symptom_input.duration is not None and not isinstance(symptom_input.duration, str):
+            raise ValueError("duration must be a string")
+        
+        rating = symptom_input.severity_self_rating
+        if rating is not None and (isinstance(rating, bool) or not isinstance(rating, (int, float))):
+            raise ValueError("severity_self_rating must be a number")
     
     def _calculate_urgency_score(self, symptom_input: SymptomInput) -> int:
         """Calculate urgency score from 1-10 based on symptoms"""
@@ -390,40 +452,35 @@ class SymptomAnalyzer:
     
     def _identify_red_flags(self, symptom_input: SymptomInput) -> List[str]:
         """Identify red flag indicators in symptoms"""
-        red_flags = []
+        red_flags = set()
         
         for symptom in symptom_input.symptoms + symptom_input.associated_symptoms:
             symptom_lower = symptom.lower().strip()
             
             # Check against red flag patterns
-            for category, pattern_data in self.symptom_patterns.items():
-                for red_flag in pattern_data.get("red_flags", []):
-                    if red_flag.lower() in symptom_lower:
-                        red_flags.append(red_flag)
+            for red_flag, red_flag_lower in self._pattern_red_flags:
+                if red_flag_lower in symptom_lower:
+                    red_flags.add(red_flag)
             
-            # Check against general red flag indicators
-            for indicator in self.red_flag_indicators:
-                if any(word in symptom_lower for word in indicator.lower().split()):
-                    red_flags.append(indicator)
+            # Check against general red flag indicators sharing a word with the symptom
+            for token in _WORD_RE.findall(symptom_lower):
+                red_flags.update(self._token_to_indicators.get(token, ()))
         
-        return list(set(red_flags))  # Remove duplicates
+        return list(red_flags)
     
     def _suggest_conditions(self, symptom_input: SymptomInput, urgency_score: int) -> List[ConditionSuggestion]:
         """Suggest possible medical conditions based on symptoms"""
-        suggestions = []
+        candidates = []
+        
+        # Match each input symptom against the shared vocabulary once
+        query_masks = [self._symptom_vocab_mask(symptom.lower().strip()) for symptom in symptom_input.symptoms]
         
         for condition_id, condition_data in self.condition_database.items():
             # Calculate match score
-            symptom_matches = 0
+            condition_mask = self._condition_masks[condition_id]
+            symptom_matches = sum(1 for query_mask in query_masks if query_mask & condition_mask)
             total_condition_symptoms = len(condition_data["symptoms"])
             
-            for symptom in symptom_input.symptoms:
-                symptom_lower = symptom.lower().strip()
-                for condition_symptom in condition_data["symptoms"]:
-                    if condition_symptom.lower() in symptom_lower or symptom_lower in condition_symptom.lower():
-                        symptom_matches += 1
-                        break
-            
             if symptom_matches > 0:
                 # Calculate confidence score
                 confidence = symptom_matches / max(len(symptom_input.symptoms), total_condition_symptoms)
@@ -439,21 +496,20 @@ class SymptomAnalyzer:
                 confidence = min(0.95, confidence)
                 
                 if confidence >= 0.2:  # Only include if reasonable match
-                    suggestion = ConditionSuggestion(
-                        condition_name=condition_data["name"],
-                        confidence_score=confidence,
-                        description=condition_data["description"],
-                        common_symptoms=condition_data["symptoms"],
-                        severity_indicators=condition_data.get("red_flags", []),
-                        recommended_actions=condition_data.get("actions", [])
-                    )
-                    suggestions.append(suggestion)
-        
-        # Sort by confidence score
-        suggestions.sort(key=lambda x: x.confidence_score, reverse=True)
-        
-        # Return top 5 suggestions
-        return suggestions[:5]
+                    candidates.append((confidence, condition_data))
+        
+        # Keep the top 5 candidates by confidence score and only build those
+        return [
+            ConditionSuggestion(
+                condition_name=condition_data["name"],
+                confidence_score=confidence,
+                description=condition_data["description"],
+                common_symptoms=condition_data["symptoms"],
+                severity_indicators=condition_data.get("red_flags", []),
+                recommended_actions=condition_data.get("actions", [])
+            )
+            for confidence, condition_data in heapq.nlargest(5, candidates, key=itemgetter(0))
+        ]
     
     def _generate_recommendations(self, symptom_input: SymptomInput, urgency_score: int, urgency_level: UrgencyLevel) -> List[str]:
         """Generate specific recommendations based on analysis"""
@@ -9,14 +9,24 @@ This module provides REST API endpoints for symptom analysis including:
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Query, status
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import JSON, case, cast, func, insert, lambda_stmt, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass, replace
+from collections import OrderedDict
 from pydantic import BaseModel, Field, validator
+import asyncio
+import csv
 import json
 import logging
+import re
+import threading
+import uuid
+from io import StringIO
 
-from database import get_db
+from database import get_async_db, create_async_session_factory
 from models import User, SymptomRecord, HealthAnalytics
 from symptom_analyzer import (
     SymptomAnalyzer, 
@@ -34,6 +44,85 @@ router = APIRouter(prefix="/symptoms", tags=["symptom-checker"])
 # Initialize symptom analyzer
 symptom_analyzer = SymptomAnalyzer()
 
+# Rows fetched per round trip when streaming exports
+EXPORT_STREAM_BATCH_SIZE = 1000
+
+# Time-ordered UUIDs keep newly written analysis IDs clustered in indexes;
+# fall back to random UUIDs on interpreters without uuid.uuid7 (< 3.14)
+_uuid7 = getattr(uuid, "uuid7", uuid.uuid4)
+
+CSV_EXPORT_HEADER = [
+    "Record ID", "Date", "Symptoms", "Duration", "Severity Rating",
+    "Location", "Triggers", "Alleviating Factors", "Associated Symptoms",
+    "Urgency Level", "Urgency Score", "Follow-up Required"
+]
+
+# Keyword categories for the most common symptom, and their recommendations
+SYMPTOM_CATEGORY_PATTERN = re.compile(r"(?P<headache>headache)|(?P<pain>pain)|(?P<fatigue>fatigue|tired)")
+
+SYMPTOM_CATEGORY_RECOMMENDATIONS = {
+    "headache": [
+        "Keep a headache diary to identify triggers",
+        "Ensure adequate hydration and regular sleep schedule"
+    ],
+    "pain": [
+        "Consider discussing pain management strategies with your healthcare provider"
+    ],
+    "fatigue": [
+        "Evaluate your sleep quality and duration",
+        "Consider discussing fatigue with your healthcare provider"
+    ],
+}
+
+# LRU cache of analyses for identical symptom inputs
+ANALYSIS_CACHE_SIZE = 4096
+_analysis_cache: "OrderedDict[Tuple, SymptomAnalysis]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+# Batched symptom history writer settings
+SYMPTOM_RECORD_BATCH_SIZE = 500
+SYMPTOM_RECORD_FLUSH_INTERVAL = 0.25  # seconds
+
+# Queue of pending symptom record rows, created when the writer task starts
+_symptom_record_queue: Optional[asyncio.Queue] = None
+
+# Queued by stop_symptom_record_writer() to make the writer flush and exit
+_SYMPTOM_WRITER_STOP = object()
+
+
+@dataclass(frozen=True)
+class DemoUserCache:
+    """Demo user fields needed by the symptom endpoints"""
+    id: str
+    age: Optional[int]
+    gender: Optional[str]
+
+
+# Cached demo user, loaded once instead of queried on every request
+_demo_user_cache: Optional[DemoUserCache] = None
+
+_DISCLAIMER = (
+    "This analysis is for informational purposes only and does not replace professional "
+    "medical advice. Always consult with a healthcare provider for proper diagnosis and treatment."
+)
+
+# Static part of a successful health check response
+_HEALTH_OK_TEMPLATE = {
+    "status": "healthy",
+    "service": "symptom-checker",
+    "analyzer_status": "operational"
+}
+
+# Set once the startup canary analysis has succeeded
+_analyzer_ok = False
+
+
+def _utc_naive(value: datetime) -> datetime:
+    """Convert to the naive UTC form stored in SymptomRecord.recorded_at"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
 
 # Pydantic models for API requests/responses
 class SymptomAnalysisRequest(BaseModel):
@@ -69,6 +158,42 @@ class SymptomAnalysisRequest(BaseModel):
         return normalized_symptoms[:10]  # Limit to 10 symptoms
 
 
+UrgencyLevelFilter = Literal["routine", "moderate", "urgent", "emergency", "critical"]
+
+
+class HistoryQuery(BaseModel):
+    """Query parameters for symptom history"""
+    limit: int = Field(20, ge=1, le=100, description="Number of records to return")
+    offset: int = Field(0, ge=0, description="Number of records to skip")
+    urgency_filter: Optional[UrgencyLevelFilter] = Field(None, description="Filter by urgency level")
+    date_from: Optional[datetime] = Field(None, description="Filter from date (ISO format)")
+    date_to: Optional[datetime] = Field(None, description="Filter to date (ISO format)")
+    
+    @validator('urgency_filter', pre=True)
+    def normalize_urgency_filter(cls, v):
+        """Accept urgency levels case-insensitively; an empty value means no filter"""
+        if isinstance(v, str):
+            return v.strip().lower() or None
+        return v
+    
+    @validator('date_from', 'date_to')
+    def normalize_date(cls, v):
+        """Compare against recorded_at as naive UTC"""
+        return _utc_naive(v) if v else v
+
+
+class ExportQuery(BaseModel):
+    """Query parameters for symptom data export"""
+    format: Literal["json", "csv"] = Field("json", description="Export format (json or csv)")
+    date_from: Optional[datetime] = Field(None, description="Export from date (ISO format)")
+    date_to: Optional[datetime] = Field(None, description="Export to date (ISO format)")
+    
+    @validator('date_from', 'date_to')
+    def normalize_date(cls, v):
+        """Compare against recorded_at as naive UTC"""
+        return _utc_naive(v) if v else v
+
+
 class ConditionSuggestionResponse(BaseModel):
     """Response model for condition suggestions"""
     condition_name: str
@@ -118,56 +243,318 @@ class SymptomInsightsResponse(BaseModel):
 
 
 # Helper functions
-def get_demo_user(db: Session) -> User:
+async def _get_or_create_demo_user(db: AsyncSession) -> User:
     """Get or create demo user for symptom tracking"""
-    user = db.query(User).filter(User.firebase_uid == "demo-user").first()
+    user = await db.scalar(select(User).where(User.firebase_uid == "demo-user"))
     if not user:
+        # Timestamp columns are naive UTC; the model defaults are aware
+        now = _utc_naive(datetime.now(timezone.utc))
         user = User(
             firebase_uid="demo-user",
             email="demo@mydoc.ai",
-            display_name="Demo User"
+            display_name="Demo User",
+            created_at=now,
+            updated_at=now
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     return user
 
 
-def convert_analysis_to_response(analysis: SymptomAnalysis, analysis_id: str) -> SymptomAnalysisResponse:
-    """Convert SymptomAnalysis to API response format"""
-    return SymptomAnalysisResponse(
-        analysis_id=analysis_id,
-        urgency_score=analysis.urgency_score,
-        urgency_level=analysis.urgency_level.value,
-        severity_level=analysis.severity_level.value,
-        primary_symptoms=analysis.primary_symptoms,
-        red_flags=analysis.red_flags,
-        possible_conditions=[
-            ConditionSuggestionResponse(
-                condition_name=condition.condition_name,
-                confidence_score=condition.confidence_score,
-                description=condition.description,
-                common_symptoms=condition.common_symptoms,
-                severity_indicators=condition.severity_indicators,
-                recommended_actions=condition.recommended_actions
-            )
+async def refresh_demo_user_cache(db: AsyncSession) -> DemoUserCache:
+    """Load the demo user from the database and replace the cached copy"""
+    global _demo_user_cache
+    user = await _get_or_create_demo_user(db)
+    _demo_user_cache = DemoUserCache(id=user.id, age=user.get_age(), gender=user.gender)
+    return _demo_user_cache
+
+
+async def get_demo_user(db: AsyncSession) -> DemoUserCache:
+    """Get the cached demo user, loading it on first use"""
+    if _demo_user_cache is None:
+        return await refresh_demo_user_cache(db)
+    return _demo_user_cache
+
+
+async def warm_demo_user_cache():
+    """Load the demo user cache at startup so requests skip the lookup"""
+    AsyncSessionLocal = create_async_session_factory()
+    async with AsyncSessionLocal() as db:
+        user = await refresh_demo_user_cache(db)
+    logger.info(f"Demo user cache loaded for user {user.id}")
+
+
+def check_symptom_analyzer():
+    """Run a canary analysis and record that the analyzer is operational"""
+    global _analyzer_ok
+    
+    symptom_analyzer.analyze_symptoms(SymptomInput(symptoms=["test symptom"]))
+    _analyzer_ok = True
+
+
+async def _insert_symptom_records(rows: List[Dict[str, Any]]) -> None:
+    """Insert a batch of symptom record rows in a single executemany"""
+    AsyncSessionLocal = create_async_session_factory()
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(SymptomRecord), rows)
+        await db.commit()
+
+
+def _drain_symptom_record_queue(queue: asyncio.Queue) -> List[Dict[str, Any]]:
+    """Take every row currently waiting in the queue without blocking"""
+    rows = []
+    while not queue.empty():
+        row = queue.get_nowait()
+        if row is not _SYMPTOM_WRITER_STOP:
+            rows.append(row)
+    return rows
+
+
+async def _save_symptom_records(rows: List[Dict[str, Any]], label: str = "") -> None:
+    """Persist a batch of rows, logging instead of raising on failure"""
+    try:
+        await _insert_symptom_records(rows)
+        logger.info(f"Saved {len(rows)} {label}symptom records")
+    except Exception as save_error:
+        logger.error(f"Failed to save {len(rows)} {label}symptom records: {save_error}")
+
+
+async def symptom_record_writer():
+    """
+    Background task that persists queued symptom records in batches
+    
+    Rows are flushed once SYMPTOM_RECORD_BATCH_SIZE rows are waiting or
+    SYMPTOM_RECORD_FLUSH_INTERVAL seconds after the first row of a batch arrived.
+    The task exits after flushing once stop_symptom_record_writer() is called
+    (or the task is cancelled).
+    """
+    global _symptom_record_queue
+    queue = _symptom_record_queue = asyncio.Queue()
+    rows: List[Dict[str, Any]] = []
+    stopping = False
+    
+    try:
+        while not stopping:
+            row = await queue.get()
+            if row is _SYMPTOM_WRITER_STOP:
+                break
+            rows = [row]
+            
+            # asyncio.timeout (unlike wait_for on 3.11) never swallows a
+            # cancellation that lands in the same tick as a queue delivery
+            try:
+                async with asyncio.timeout(SYMPTOM_RECORD_FLUSH_INTERVAL):
+                    while len(rows) < SYMPTOM_RECORD_BATCH_SIZE:
+                        row = await queue.get()
+                        if row is _SYMPTOM_WRITER_STOP:
+                            stopping = True
+                            break
+                        rows.append(row)
+            except TimeoutError:
+                pass
+            
+            await _save_symptom_records(rows)
+            rows = []
+    
+    finally:
+        # Flush whatever is still pending before shutting down
+        _symptom_record_queue = None
+        rows.extend(_drain_symptom_record_queue(queue))
+        if rows:
+            await _save_symptom_records(rows, "pending ")
+
+
+async def stop_symptom_record_writer(task: asyncio.Task) -> None:
+    """Ask the writer task to flush pending records and wait for it to exit"""
+    if _symptom_record_queue is not None:
+        _symptom_record_queue.put_nowait(_SYMPTOM_WRITER_STOP)
+    else:
+        task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def _analysis_cache_key(symptom_input: SymptomInput) -> Tuple:
+    """Cache key covering every SymptomInput field the analyzer reads"""
+    return (
+        tuple(symptom_input.symptoms),
+        symptom_input.duration,
+        symptom_input.severity_self_rating,
+        symptom_input.location,
+        tuple(symptom_input.triggers),
+        tuple(symptom_input.associated_symptoms),
+        tuple(symptom_input.medical_history),
+        tuple(symptom_input.current_medications),
+    )
+
+
+def analyze_symptoms_cached(symptom_input: SymptomInput) -> SymptomAnalysis:
+    """Run the symptom analyzer, reusing the result for repeated identical inputs"""
+    key = _analysis_cache_key(symptom_input)
+    
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(key)
+        if cached is not None:
+            _analysis_cache.move_to_end(key)
+    
+    if cached is not None:
+        return replace(cached, analysis_timestamp=datetime.utcnow())
+    
+    analysis = symptom_analyzer.analyze_symptoms(symptom_input)
+    
+    with _analysis_cache_lock:
+        _analysis_cache[key] = analysis
+        _analysis_cache.move_to_end(key)
+        if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    
+    return analysis
+
+
+def _symptom_elements(dialect_name: str):
+    """Table-valued function expanding each record's symptoms JSON array into rows"""
+    if dialect_name == "postgresql":
+        # json_array_elements_text raises on JSON null, so expand an empty array instead
+        symptoms_array = case(
+            (func.json_typeof(SymptomRecord.symptoms) == "array", SymptomRecord.symptoms),
+            else_=cast("[]", JSON)
+        )
+        return func.json_array_elements_text(symptoms_array).table_valued("value")
+    return func.json_each(SymptomRecord.symptoms).table_valued("value")
+
+
+def _export_record(record: SymptomRecord) -> Dict[str, Any]:
+    """Convert a SymptomRecord into its export representation"""
+    analysis_results = record.analysis_results or {}
+    return {
+        "record_id": record.id,
+        "recorded_at": record.recorded_at.isoformat(),
+        "symptoms": record.symptoms or [],
+        "duration": record.duration,
+        "severity_rating": record.severity_rating,
+        "location": record.location,
+        "triggers": record.triggers or [],
+        "alleviating_factors": record.alleviating_factors or [],
+        "associated_symptoms": record.associated_symptoms or [],
+        "urgency_level": record.urgency_level,
+        "requires_follow_up": record.requires_follow_up,
+        "analysis_summary": {
+            "urgency_score": analysis_results.get("urgency_score", 0),
+            "confidence_score": analysis_results.get("confidence_score", 0.0),
+            "red_flags": analysis_results.get("red_flags", []),
+            "emergency_indicators": analysis_results.get("emergency_indicators", [])
+        }
+    }
+
+
+async def _fetch_scalar(statement):
+    """Run a scalar query on its own session so it can overlap with others"""
+    AsyncSessionLocal = create_async_session_factory()
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(statement)
+
+
+async def _fetch_rows(statement) -> List[Any]:
+    """Run a row query on its own session so it can overlap with others"""
+    AsyncSessionLocal = create_async_session_factory()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(statement)
+        return result.all()
+
+
+async def _stream_export_records(query):
+    """Yield export records one at a time from a server-side cursor"""
+    AsyncSessionLocal = create_async_session_factory()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_STREAM_BATCH_SIZE))
+        async for record in result.scalars():
+            yield _export_record(record)
+
+
+def _csv_line(row: List[Any], buffer: StringIO, writer) -> str:
+    """Render a single CSV row using a reusable buffer"""
+    buffer.seek(0)
+    buffer.truncate(0)
+    writer.writerow(row)
+    return buffer.getvalue()
+
+
+async def _stream_csv_export(query):
+    """Stream the CSV export row by row"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    
+    yield _csv_line(CSV_EXPORT_HEADER, buffer, writer)
+    async for record in _stream_export_records(query):
+        yield _csv_line([
+            record["record_id"],
+            record["recorded_at"],
+            "; ".join(record["symptoms"]),
+            record["duration"] or "",
+            record["severity_rating"] or "",
+            record["location"] or "",
+            "; ".join(record["triggers"]),
+            "; ".join(record["alleviating_factors"]),
+            "; ".join(record["associated_symptoms"]),
+            record["urgency_level"],
+            record["analysis_summary"]["urgency_score"],
+            record["requires_follow_up"]
+        ], buffer, writer)
+
+
+async def _stream_json_export(query, export_info: Dict[str, Any]):
+    """Stream the JSON export document one record at a time"""
+    yield '{\n  "export_info": ' + json.dumps(export_info) + ',\n  "symptom_records": ['
+    separator = "\n    "
+    async for record in _stream_export_records(query):
+        yield separator + json.dumps(record)
+        separator = ",\n    "
+    yield "\n  ]\n}\n"
+
+
+def convert_analysis_to_response(analysis: SymptomAnalysis, analysis_id: str) -> Dict[str, Any]:
+    """
+    Convert SymptomAnalysis to API response format
+    
+    Builds the SymptomAnalysisResponse shape as a plain dict; the values are
+    produced server-side so re-validating them through Pydantic is skipped.
+    """
+    return {
+        "analysis_id": analysis_id,
+        "urgency_score": analysis.urgency_score,
+        "urgency_level": analysis.urgency_level.value,
+        "severity_level": analysis.severity_level.value,
+        "primary_symptoms": analysis.primary_symptoms,
+        "red_flags": analysis.red_flags,
+        "possible_conditions": [
+            {
+                "condition_name": condition.condition_name,
+                "confidence_score": condition.confidence_score,
+                "description": condition.description,
+                "common_symptoms": condition.common_symptoms,
+                "severity_indicators": condition.severity_indicators,
+                "recommended_actions": condition.recommended_actions
+            }
             for condition in analysis.possible_conditions
         ],
-        recommendations=analysis.recommendations,
-        follow_up_questions=analysis.follow_up_questions,
-        emergency_indicators=analysis.emergency_indicators,
-        confidence_score=analysis.confidence_score,
-        requires_immediate_attention=analysis.requires_immediate_attention,
-        analysis_timestamp=analysis.analysis_timestamp.isoformat(),
-        disclaimer="This analysis is for informational purposes only and does not replace professional medical advice. Always consult with a healthcare provider for proper diagnosis and treatment."
-    )
+        "recommendations": analysis.recommendations,
+        "follow_up_questions": analysis.follow_up_questions,
+        "emergency_indicators": analysis.emergency_indicators,
+        "confidence_score": analysis.confidence_score,
+        "requires_immediate_attention": analysis.requires_immediate_attention,
+        "analysis_timestamp": analysis.analysis_timestamp.isoformat(),
+        "disclaimer": _DISCLAIMER
+    }
 
 
 # API Endpoints
-@router.post("/analyze", response_model=SymptomAnalysisResponse)
+@router.post("/analyze", response_model=SymptomAnalysisResponse, response_class=ORJSONResponse)
 async def analyze_symptoms(
     request: SymptomAnalysisRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     save_to_history: bool = Query(True, description="Whether to save analysis to user's history")
 ):
     """
@@ -180,8 +567,10 @@ async def analyze_symptoms(
     - Emergency indicator detection
     """
     try:
+        now = datetime.now(timezone.utc)
+        
         # Get demo user
-        user = get_demo_user(db)
+        user = await get_demo_user(db)
         
         # Create symptom input
         symptom_input = SymptomInput(
@@ -194,62 +583,69 @@ async def analyze_symptoms(
             associated_symptoms=request.associated_symptoms,
             medical_history=request.medical_history,
             current_medications=request.current_medications,
-            age=user.get_age(),
+            age=user.age,
             gender=user.gender
         )
         
-        # Perform symptom analysis
-        analysis = symptom_analyzer.analyze_symptoms(symptom_input)
+        # Perform symptom analysis off the event loop
+        analysis = await asyncio.to_thread(analyze_symptoms_cached, symptom_input)
         
         # Generate unique analysis ID
-        import uuid
-        analysis_id = str(uuid.uuid4())
+        analysis_id = str(_uuid7())
         
         # Save to symptom history if requested
         if save_to_history:
-            try:
-                symptom_record = SymptomRecord(
-                    user_id=user.id,
-                    symptoms=request.symptoms,
-                    duration=request.duration,
-                    severity_rating=request.severity_rating,
-                    location=request.location,
-                    triggers=request.triggers,
-                    alleviating_factors=request.alleviating_factors,
-                    associated_symptoms=request.associated_symptoms,
-                    analysis_results={
-                        "analysis_id": analysis_id,
-                        "urgency_score": analysis.urgency_score,
-                        "urgency_level": analysis.urgency_level.value,
-                        "severity_level": analysis.severity_level.value,
-                        "confidence_score": analysis.confidence_score,
-                        "requires_immediate_attention": analysis.requires_immediate_attention,
-                        "red_flags": analysis.red_flags,
-                        "emergency_indicators": analysis.emergency_indicators,
-                        "possible_conditions": [
-                            {
-                                "name": condition.condition_name,
-                                "confidence": condition.confidence_score
-                            }
-                            for condition in analysis.possible_conditions
-                        ]
-                    },
-                    urgency_level=analysis.urgency_level.value,
-                    requires_follow_up=analysis.requires_immediate_attention or analysis.urgency_score >= 6,
-                    recorded_at=datetime.utcnow()
-                )
-                db.add(symptom_record)
-                db.commit()
-                
-                logger.info(f"Symptom analysis saved for user {user.id}: urgency={analysis.urgency_score}")
-                
-            except Exception as save_error:
-                logger.error(f"Failed to save symptom record: {save_error}")
-                db.rollback()
-                # Continue with analysis even if saving fails
+            symptom_row = {
+                "user_id": user.id,
+                "symptoms": request.symptoms,
+                "duration": request.duration,
+                "severity_rating": request.severity_rating,
+                "location": request.location,
+                "triggers": request.triggers,
+                "alleviating_factors": request.alleviating_factors,
+                "associated_symptoms": request.associated_symptoms,
+                "analysis_results": {
+                    "analysis_id": analysis_id,
+                    "urgency_score": analysis.urgency_score,
+                    "urgency_level": analysis.urgency_level.value,
+                    "severity_level": analysis.severity_level.value,
+                    "confidence_score": analysis.confidence_score,
+                    "requires_immediate_attention": analysis.requires_immediate_attention,
+                    "red_flags": analysis.red_flags,
+                    "emergency_indicators": analysis.emergency_indicators,
+                    "possible_conditions": [
+                        {
+                            "name": condition.condition_name,
+                            "confidence": condition.confidence_score
+                        }
+                        for condition in analysis.possible_conditions
+                    ]
+                },
+                "urgency_level": analysis.urgency_level.value,
+                "requires_follow_up": analysis.requires_immediate_attention or analysis.urgency_score >= 6,
+                # Timestamp columns are naive UTC; asyncpg rejects aware values
+                "recorded_at": _utc_naive(now),
+                "created_at": _utc_naive(now),
+                "updated_at": _utc_naive(now)
+            }
+            
+            if _symptom_record_queue is not None:
+                # Hand the row to the batched writer so the response is not blocked on a commit
+                _symptom_record_queue.put_nowait(symptom_row)
+            else:
+                try:
+                    await db.execute(insert(SymptomRecord), [symptom_row])
+                    await db.commit()
+                    
+                    logger.info(f"Symptom analysis saved for user {user.id}: urgency={analysis.urgency_score}")
+                    
+                except Exception as save_error:
+                    logger.error(f"Failed to save symptom record: {save_error}")
+                    await db.rollback()
+                    # Continue with analysis even if saving fails
         
-        # Convert to response format
-        response = convert_analysis_to_response(analysis, analysis_id)
+        # Convert to response format, serialized directly by orjson
+        response = ORJSONResponse(convert_analysis_to_response(analysis, analysis_id))
         
         logger.info(f"Symptom analysis completed: urgency={analysis.urgency_score}, conditions={len(analysis.possible_conditions)}")
         
@@ -271,12 +667,8 @@ async def analyze_symptoms(
 
 @router.get("/history", response_model=List[SymptomHistoryResponse])
 async def get_symptom_history(
-    db: Session = Depends(get_db),
-    limit: int = Query(20, ge=1, le=100, description="Number of records to return"),
-    offset: int = Query(0, ge=0, description="Number of records to skip"),
-    urgency_filter: Optional[str] = Query(None, description="Filter by urgency level"),
-    date_from: Optional[str] = Query(None, description="Filter from date (ISO format)"),
-    date_to: Optional[str] = Query(None, description="Filter to date (ISO format)")
+    params: HistoryQuery = Query(),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get user's symptom analysis history with filtering options
@@ -285,51 +677,53 @@ async def get_symptom_history(
     """
     try:
         # Get demo user
-        user = get_demo_user(db)
+        user = await get_demo_user(db)
         
-        # Build query
-        query = db.query(SymptomRecord).filter(SymptomRecord.user_id == user.id)
+        # Build query selecting only the columns the summary needs, as plain rows.
+        # lambda_stmt caches the constructed and compiled statement per lambda, so
+        # repeated requests only rebind user id, filters and pagination values.
+        user_id = user.id
+        query = lambda_stmt(lambda: select(
+            SymptomRecord.id,
+            SymptomRecord.symptoms,
+            SymptomRecord.recorded_at,
+            SymptomRecord.urgency_level,
+            SymptomRecord.requires_follow_up,
+            SymptomRecord.analysis_results
+        ).where(SymptomRecord.user_id == user_id))
         
         # Apply filters
-        if urgency_filter:
-            valid_urgency_levels = ["routine", "moderate", "urgent", "emergency", "critical"]
-            if urgency_filter.lower() in valid_urgency_levels:
-                query = query.filter(SymptomRecord.urgency_level == urgency_filter.lower())
+        if params.urgency_filter:
+            urgency_level = params.urgency_filter
+            query += lambda s: s.where(SymptomRecord.urgency_level == urgency_level)
         
-        if date_from:
-            try:
-                from_date = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-                query = query.filter(SymptomRecord.recorded_at >= from_date)
-            except ValueError:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid date_from format. Use ISO format (YYYY-MM-DDTHH:MM:SS)"
-                )
+        if params.date_from:
+            from_date = params.date_from
+            query += lambda s: s.where(SymptomRecord.recorded_at >= from_date)
         
-        if date_to:
-            try:
-                to_date = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-                query = query.filter(SymptomRecord.recorded_at <= to_date)
-            except ValueError:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid date_to format. Use ISO format (YYYY-MM-DDTHH:MM:SS)"
-                )
+        if params.date_to:
+            to_date = params.date_to
+            query += lambda s: s.where(SymptomRecord.recorded_at <= to_date)
         
         # Get records with pagination
-        records = query.order_by(SymptomRecord.recorded_at.desc()).offset(offset).limit(limit).all()
+        limit, offset = params.limit, params.offset
+        query += lambda s: s.order_by(SymptomRecord.recorded_at.desc()).offset(offset).limit(limit)
+        result = await db.execute(query)
+        records = result.all()
         
-        # Convert to response format
+        # Convert to response format; rows come from our own table, so skip
+        # per-record validation and let the response model check the output once
         history = []
         for record in records:
-            history.append(SymptomHistoryResponse(
+            analysis_results = record.analysis_results or {}
+            history.append(SymptomHistoryResponse.model_construct(
                 record_id=record.id,
                 symptoms=record.symptoms or [],
                 analysis_summary={
-                    "urgency_score": record.analysis_results.get("urgency_score", 0) if record.analysis_results else 0,
-                    "severity_level": record.analysis_results.get("severity_level", "unknown") if record.analysis_results else "unknown",
-                    "confidence_score": record.analysis_results.get("confidence_score", 0.0) if record.analysis_results else 0.0,
-                    "condition_count": len(record.analysis_results.get("possible_conditions", [])) if record.analysis_results else 0
+                    "urgency_score": analysis_results.get("urgency_score", 0),
+                    "severity_level": analysis_results.get("severity_level", "unknown"),
+                    "confidence_score": analysis_results.get("confidence_score", 0.0),
+                    "condition_count": len(analysis_results.get("possible_conditions", []))
                 },
                 recorded_at=record.recorded_at.isoformat(),
                 urgency_level=record.urgency_level or "routine",
@@ -352,7 +746,7 @@ async def get_symptom_history(
 
 @router.get("/insights", response_model=SymptomInsightsResponse)
 async def get_symptom_insights(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     days_back: int = Query(30, ge=7, le=365, description="Number of days to analyze")
 ):
     """
@@ -362,18 +756,51 @@ async def get_symptom_insights(
     personalized health recommendations.
     """
     try:
+        # recorded_at is a naive UTC column, so the window bounds are too
+        now = _utc_naive(datetime.now(timezone.utc))
+        
         # Get demo user
-        user = get_demo_user(db)
+        user = await get_demo_user(db)
         
-        # Get symptom records from specified time period
-        cutoff_date = datetime.utcnow() - timedelta(days=days_back)
-        records = db.query(SymptomRecord).filter(
+        # Aggregate symptom records from specified time period in the database
+        cutoff_date = now - timedelta(days=days_back)
+        in_window = (
             SymptomRecord.user_id == user.id,
             SymptomRecord.recorded_at >= cutoff_date
-        ).all()
+        )
         
-        if not records:
-            return SymptomInsightsResponse(
+        # The aggregates are independent, so run them concurrently on
+        # separate sessions (an AsyncSession cannot be shared across tasks)
+        urgency = func.coalesce(SymptomRecord.urgency_level, "routine")
+        elements = _symptom_elements(db.bind.dialect.name)
+        normalized_symptom = func.lower(func.trim(elements.c.value))
+        frequency = func.count().label("frequency")
+        total_records, urgency_rows, most_common, recent_week_count = await asyncio.gather(
+            _fetch_scalar(
+                select(func.count()).select_from(SymptomRecord).where(*in_window)
+            ),
+            _fetch_rows(
+                select(urgency, func.count()).where(*in_window).group_by(urgency)
+            ),
+            _fetch_rows(
+                select(normalized_symptom.label("symptom"), frequency)
+                .select_from(SymptomRecord)
+                .join(elements, true())
+                .where(*in_window, elements.c.value.is_not(None))
+                .group_by(normalized_symptom)
+                .order_by(frequency.desc())
+                .limit(10)
+            ),
+            _fetch_scalar(
+                select(func.count()).select_from(SymptomRecord).where(
+                    SymptomRecord.user_id == user.id,
+                    SymptomRecord.recorded_at >= now - timedelta(days=7)
+                )
+            )
+        )
+        
+        if not total_records:
+            return SymptomInsightsResponse.model_construct(
                 total_symptom_records=0,
                 most_common_symptoms=[],
                 urgency_trends={},
@@ -382,25 +809,15 @@ async def get_symptom_insights(
                 risk_factors=[]
             )
         
-        # Analyze symptom patterns
-        symptom_frequency = {}
+        # Count urgency levels
         urgency_counts = {"routine": 0, "moderate": 0, "urgent": 0, "emergency": 0, "critical": 0}
-        
-        for record in records:
-            # Count symptom frequency
-            for symptom in record.symptoms or []:
-                symptom_lower = symptom.lower().strip()
-                symptom_frequency[symptom_lower] = symptom_frequency.get(symptom_lower, 0) + 1
-            
-            # Count urgency levels
-            urgency = record.urgency_level or "routine"
-            if urgency in urgency_counts:
-                urgency_counts[urgency] += 1
+        for urgency_level, count in urgency_rows:
+            if urgency_level in urgency_counts:
+                urgency_counts[urgency_level] = count
         
         # Get most common symptoms
-        most_common = sorted(symptom_frequency.items(), key=lambda x: x[1], reverse=True)[:10]
         most_common_symptoms = [
-            {"symptom": symptom, "frequency": count, "percentage": round((count / len(records)) * 100, 1)}
+            {"symptom": symptom, "frequency": count, "percentage": round((count / total_records) * 100, 1)}
             for symptom, count in most_common
         ]
         
@@ -410,15 +827,15 @@ async def get_symptom_insights(
         risk_factors = []
         
         # Analyze frequency patterns
-        if len(records) >= 3:
-            recent_records = sorted(records, key=lambda x: x.recorded_at, reverse=True)[:7]
-            if len(recent_records) >= 3:
-                pattern_insights.append(f"You've recorded {len(recent_records)} symptom episodes in the past week.")
+        if total_records >= 3:
+            # Equivalent to taking the 7 most recent records, without fetching them
+            recent_record_count = min(total_records, 7)
+            pattern_insights.append(f"You've recorded {recent_record_count} symptom episodes in the past week.")
         
         # Analyze urgency trends
         high_urgency_count = urgency_counts["urgent"] + urgency_counts["emergency"] + urgency_counts["critical"]
         if high_urgency_count > 0:
-            percentage = round((high_urgency_count / len(records)) * 100, 1)
+            percentage = round((high_urgency_count / total_records) * 100, 1)
             pattern_insights.append(f"{percentage}% of your symptoms were classified as urgent or higher.")
             if percentage > 30:
                 risk_factors.append("Frequent high-urgency symptoms")
@@ -431,26 +848,14 @@ async def get_symptom_insights(
                 pattern_insights.append(f"'{top_symptom['symptom']}' is your most frequently reported symptom ({top_symptom['frequency']} times).")
                 
                 # Symptom-specific recommendations
-                symptom_name = top_symptom["symptom"]
-                if "headache" in symptom_name:
-                    recommendations.extend([
-                        "Keep a headache diary to identify triggers",
-                        "Ensure adequate hydration and regular sleep schedule"
-                    ])
-                elif "pain" in symptom_name:
-                    recommendations.append("Consider discussing pain management strategies with your healthcare provider")
-                elif "fatigue" in symptom_name or "tired" in symptom_name:
-                    recommendations.extend([
-                        "Evaluate your sleep quality and duration",
-                        "Consider discussing fatigue with your healthcare provider"
-                    ])
+                category_match = SYMPTOM_CATEGORY_PATTERN.search(top_symptom["symptom"].lower())
+                if category_match:
+                    recommendations.extend(SYMPTOM_CATEGORY_RECOMMENDATIONS[category_match.lastgroup])
         
         # Check for concerning patterns
-        if len(records) >= 5:
-            recent_week = [r for r in records if r.recorded_at >= datetime.utcnow() - timedelta(days=7)]
-            if len(recent_week) >= 3:
-                risk_factors.append("Increased symptom frequency in recent week")
-                recommendations.append("Monitor symptoms closely and consider medical evaluation if pattern continues")
+        if total_records >= 5 and recent_week_count >= 3:
+            risk_factors.append("Increased symptom frequency in recent week")
+            recommendations.append("Monitor symptoms closely and consider medical evaluation if pattern continues")
         
         # General recommendations
         recommendations.extend([
@@ -462,18 +867,18 @@ async def get_symptom_insights(
         # Default insights if none generated
         if not pattern_insights:
             pattern_insights = [
-                f"Analyzed {len(records)} symptom records over {days_back} days.",
+                f"Analyzed {total_records} symptom records over {days_back} days.",
                 "Continue tracking to identify meaningful patterns."
             ]
         
-        logger.info(f"Generated symptom insights for user {user.id}: {len(records)} records analyzed")
+        logger.info(f"Generated symptom insights for user {user.id}: {total_records} records analyzed")
         
-        return SymptomInsightsResponse(
-            total_symptom_records=len(records),
+        return SymptomInsightsResponse.model_construct(
+            total_symptom_records=total_records,
             most_common_symptoms=most_common_symptoms,
             urgency_trends=urgency_counts,
             pattern_insights=pattern_insights,
-            recommendations=list(set(recommendations)),  # Remove duplicates
+            recommendations=list(dict.fromkeys(recommendations)),  # Remove duplicates, keeping priority order
             risk_factors=risk_factors
         )
         
@@ -487,10 +892,8 @@ async def get_symptom_insights(
 
 @router.get("/export")
 async def export_symptom_data(
-    db: Session = Depends(get_db),
-    format: str = Query("json", regex="^(json|csv)$", description="Export format (json or csv)"),
-    date_from: Optional[str] = Query(None, description="Export from date (ISO format)"),
-    date_to: Optional[str] = Query(None, description="Export to date (ISO format)")
+    params: ExportQuery = Query(),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Export symptom data for healthcare providers or personal records
@@ -499,127 +902,57 @@ async def export_symptom_data(
     healthcare providers or personal record keeping.
     """
     try:
-        from fastapi.responses import Response
-        import csv
-        from io import StringIO
+        now = datetime.now(timezone.utc)
         
         # Get demo user
-        user = get_demo_user(db)
+        user = await get_demo_user(db)
         
         # Build query with date filters
-        query = db.query(SymptomRecord).filter(SymptomRecord.user_id == user.id)
+        query = select(SymptomRecord).where(SymptomRecord.user_id == user.id)
         
-        if date_from:
-            try:
-                from_date = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-                query = query.filter(SymptomRecord.recorded_at >= from_date)
-            except ValueError:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid date_from format"
-                )
+        if params.date_from:
+            query = query.where(SymptomRecord.recorded_at >= params.date_from)
         
-        if date_to:
-            try:
-                to_date = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-                query = query.filter(SymptomRecord.recorded_at <= to_date)
-            except ValueError:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid date_to format"
-                )
+        if params.date_to:
+            query = query.where(SymptomRecord.recorded_at <= params.date_to)
         
-        records = query.order_by(SymptomRecord.recorded_at.desc()).all()
+        total_records = await db.scalar(
+            select(func.count()).select_from(query.subquery())
+        )
         
-        if not records:
+        if not total_records:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No symptom records found for the specified criteria"
             )
         
-        # Prepare export data
-        export_data = []
-        for record in records:
-            export_record = {
-                "record_id": record.id,
-                "recorded_at": record.recorded_at.isoformat(),
-                "symptoms": record.symptoms or [],
-                "duration": record.duration,
-                "severity_rating": record.severity_rating,
-                "location": record.location,
-                "triggers": record.triggers or [],
-                "alleviating_factors": record.alleviating_factors or [],
-                "associated_symptoms": record.associated_symptoms or [],
-                "urgency_level": record.urgency_level,
-                "requires_follow_up": record.requires_follow_up,
-                "analysis_summary": {
-                    "urgency_score": record.analysis_results.get("urgency_score", 0) if record.analysis_results else 0,
-                    "confidence_score": record.analysis_results.get("confidence_score", 0.0) if record.analysis_results else 0.0,
-                    "red_flags": record.analysis_results.get("red_flags", []) if record.analysis_results else [],
-                    "emergency_indicators": record.analysis_results.get("emergency_indicators", []) if record.analysis_results else []
+        query = query.order_by(SymptomRecord.recorded_at.desc())
+        
+        logger.info(f"Exporting {total_records} symptom records for user {user.id} in {params.format} format")
+        
+        # Stream the export so records are never all held in memory
+        if params.format == "json":
+            export_info = {
+                "user_id": user.id,
+                "export_date": now.isoformat(),
+                "total_records": total_records,
+                "date_range": {
+                    "from": params.date_from.isoformat() if params.date_from else None,
+                    "to": params.date_to.isoformat() if params.date_to else None
                 }
             }
-            export_data.append(export_record)
-        
-        # Generate export based on format
-        if format == "json":
-            export_content = json.dumps({
-                "export_info": {
-                    "user_id": user.id,
-                    "export_date": datetime.utcnow().isoformat(),
-                    "total_records": len(export_data),
-                    "date_range": {
-                        "from": date_from,
-                        "to": date_to
-                    }
-                },
-                "symptom_records": export_data
-            }, indent=2)
             
-            return Response(
-                content=export_content,
+            return StreamingResponse(
+                _stream_json_export(query, export_info),
                 media_type="application/json",
-                headers={"Content-Disposition": f"attachment; filename=symptom_history_{datetime.utcnow().strftime('%Y%m%d')}.json"}
+                headers={"Content-Disposition": f"attachment; filename=symptom_history_{now.strftime('%Y%m%d')}.json"}
             )
         
-        elif format == "csv":
-            output = StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            writer.writerow([
-                "Record ID", "Date", "Symptoms", "Duration", "Severity Rating",
-                "Location", "Triggers", "Alleviating Factors", "Associated Symptoms",
-                "Urgency Level", "Urgency Score", "Follow-up Required"
-            ])
-            
-            # Write data rows
-            for record in export_data:
-                writer.writerow([
-                    record["record_id"],
-                    record["recorded_at"],
-                    "; ".join(record["symptoms"]),
-                    record["duration"] or "",
-                    record["severity_rating"] or "",
-                    record["location"] or "",
-                    "; ".join(record["triggers"]),
-                    "; ".join(record["alleviating_factors"]),
-                    "; ".join(record["associated_symptoms"]),
-                    record["urgency_level"],
-                    record["analysis_summary"]["urgency_score"],
-                    record["requires_follow_up"]
-                ])
-            
-            csv_content = output.getvalue()
-            output.close()
-            
-            return Response(
-                content=csv_content,
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=symptom_history_{datetime.utcnow().strftime('%Y%m%d')}.csv"}
-            )
-        
-        logger.info(f"Exported {len(export_data)} symptom records for user {user.id} in {format} format")
+        return StreamingResponse(
+            _stream_csv_export(query),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=symptom_history_{now.strftime('%Y%m%d')}.csv"}
+        )
         
     except HTTPException:
         raise
@@ -634,18 +967,20 @@ async def export_symptom_data(
 @router.delete("/history/{record_id}")
 async def delete_symptom_record(
     record_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a specific symptom record"""
     try:
         # Get demo user
-        user = get_demo_user(db)
+        user = await get_demo_user(db)
         
         # Find the record
-        record = db.query(SymptomRecord).filter(
-            SymptomRecord.id == record_id,
-            SymptomRecord.user_id == user.id
-        ).first()
+        record = await db.scalar(
+            select(SymptomRecord).where(
+                SymptomRecord.id == record_id,
+                SymptomRecord.user_id == user.id
+            )
+        )
         
         if not record:
             raise HTTPException(
@@ -654,8 +989,8 @@ async def delete_symptom_record(
             )
         
         # Delete the record
-        db.delete(record)
-        db.commit()
+        await db.delete(record)
+        await db.commit()
         
         logger.info(f"Deleted symptom record {record_id} for user {user.id}")
         
@@ -665,33 +1000,59 @@ async def delete_symptom_record(
         raise
     except Exception as e:
         logger.error(f"Failed to delete symptom record: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete symptom record"
         )
 
 
+@router.post("/internal/refresh-user")
+async def refresh_demo_user(db: AsyncSession = Depends(get_async_db)):
+    """Reload the cached demo user after its profile changes"""
+    try:
+        user = await refresh_demo_user_cache(db)
+        return {"message": "Demo user cache refreshed", "user_id": user.id}
+    except Exception as e:
+        logger.error(f"Failed to refresh demo user cache: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to refresh demo user cache"
+        )
+
+
 # Health check endpoint for symptom checker
 @router.get("/health")
 async def symptom_checker_health():
-    """Health check endpoint for symptom checker service"""
-    try:
-        # Test symptom analyzer
-        test_input = SymptomInput(symptoms=["test symptom"])
-        test_analysis = symptom_analyzer.analyze_symptoms(test_input)
-        
+    """
+    Lightweight health check for symptom checker service
+    
+    Suitable for liveness/readiness probes: reports the result of the startup
+    canary analysis without running the analyzer.
+    """
+    if not _analyzer_ok:
         return {
-            "status": "healthy",
+            "status": "degraded",
             "service": "symptom-checker",
-            "analyzer_status": "operational",
-            "timestamp": datetime.utcnow().isoformat()
+            "analyzer_status": "unverified",
+            "timestamp": datetime.now(timezone.utc).isoformat()
         }
+    
+    return {**_HEALTH_OK_TEMPLATE, "timestamp": datetime.now(timezone.utc).isoformat()}
+
+
+@router.get("/health/deep")
+async def symptom_checker_deep_health():
+    """Deep health check that runs a canary analysis through the symptom analyzer"""
+    try:
+        await asyncio.to_thread(check_symptom_analyzer)
+        
+        return {**_HEALTH_OK_TEMPLATE, "timestamp": datetime.now(timezone.utc).isoformat()}
     except Exception as e:
         logger.error(f"Symptom checker health check failed: {e}")
         return {
             "status": "unhealthy",
             "service": "symptom-checker",
             "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
-        }
\ No newline at end of file
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
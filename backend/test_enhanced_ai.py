@@ -15,19 +15,30 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from enhanced_medical_ai import enhanced_medical_ai, MedicalConsultationRequest
 
+# Limit concurrent consultations so parallel tests stay within provider rate limits
+consultation_semaphore = asyncio.Semaphore(4)
 
-async def test_basic_consultation():
-    """Test basic medical consultation"""
-    print("🧪 Testing basic medical consultation...")
-    
+
+async def run_consultation(message: str):
+    """Run a consultation for a test message, bounded by the shared semaphore"""
     request = MedicalConsultationRequest(
-        message="I have a mild headache that started this morning. What could be causing it?",
+        message=message,
         user_id="test-user",
         context={}
     )
     
+    async with consultation_semaphore:
+        return await enhanced_medical_ai.medical_consultation(request)
+
+
+async def test_basic_consultation():
+    """Test basic medical consultation"""
+    print("🧪 Testing basic medical consultation...")
+    
     try:
-        response = await enhanced_medical_ai.medical_consultation(request)
+        response = await run_consultation(
+            "I have a mild headache that started this morning. What could be causing it?"
+        )
         
         print(f"✅ Basic consultation successful")
         print(f"   Emergency detected: {response.is_emergency}")
@@ -55,23 +66,20 @@ async def test_emergency_detection():
         "I took too many pills and feel sick"
     ]
     
-    for message in emergency_messages:
-        request = MedicalConsultationRequest(
-            message=message,
-            user_id="test-user",
-            context={}
-        )
-        
-        try:
-            response = await enhanced_medical_ai.medical_consultation(request)
-            
-            print(f"   Message: '{message[:30]}...'")
-            print(f"   Emergency: {response.is_emergency} | Urgency: {response.emergency_assessment.urgency_score}/10")
-            print(f"   Level: {response.emergency_assessment.emergency_level.value}")
-            
-        except Exception as e:
-            print(f"   ❌ Emergency test failed for '{message[:30]}...': {e}")
+    # The messages are independent, so consult on all of them concurrently
+    responses = await asyncio.gather(
+        *(run_consultation(message) for message in emergency_messages),
+        return_exceptions=True
+    )
+    
+    for message, response in zip(emergency_messages, responses):
+        if isinstance(response, Exception):
+            print(f"   ❌ Emergency test failed for '{message[:30]}...': {response}")
             return False
+        
+        print(f"   Message: '{message[:30]}...'")
+        print(f"   Emergency: {response.is_emergency} | Urgency: {response.emergency_assessment.urgency_score}/10")
+        print(f"   Level: {response.emergency_assessment.emergency_level.value}")
     
     print("✅ Emergency detection tests completed")
     return True
@@ -81,14 +89,8 @@ async def test_response_validation():
     """Test response validation"""
     print("\n🔍 Testing response validation...")
     
-    request = MedicalConsultationRequest(
-        message="What medications should I take for my diabetes?",
-        user_id="test-user",
-        context={}
-    )
-    
     try:
-        response = await enhanced_medical_ai.medical_consultation(request)
+        response = await run_consultation("What medications should I take for my diabetes?")
         
         print(f"✅ Response validation successful")
         print(f"   Validation result: {response.validation.validation_result.value}")
@@ -135,14 +137,16 @@ async def main():
         test_service_health
     ]
     
+    # The tests are independent, so run them concurrently
+    outcomes = await asyncio.gather(*(test() for test in tests), return_exceptions=True)
+    
     results = []
-    for test in tests:
-        try:
-            result = await test()
-            results.append(result)
-        except Exception as e:
-            print(f"❌ Test {test.__name__} crashed: {e}")
+    for test, outcome in zip(tests, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"❌ Test {test.__name__} crashed: {outcome}")
             results.append(False)
+        else:
+            results.append(outcome)
     
     # Summary
     passed = sum(results)
@@ -1,107 +1,210 @@
-import pytest
 import asyncio
+import os
+import pytest
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from main import app
-from database import get_db, Base
+import database
+import symptom_api
+from database import get_db, get_async_db, Base
 from models import User, Conversation, Message, MedicalRecord
 
-# Test database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Test database URL: in-memory, shared across threads through a single
+# StaticPool connection so TestClient requests see the same database.
+# Named per pytest-xdist worker so parallel workers never share a database.
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER", "master")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///file:testdb_{XDIST_WORKER}?mode=memory&cache=shared&uri=true"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Async endpoints get their own in-memory database on a single aiosqlite
+# connection; it is emptied after every test instead of rolled back
+async_engine = create_async_engine(
+    "sqlite+aiosqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Sessions the app opens itself (startup, background writer, concurrent
+# insight queries) must use the test databases too, never the configured one
+database.engine = engine
+database.async_engine = async_engine
+database.AsyncSessionLocal = TestingAsyncSessionLocal
+
+
+# pysqlite's own transaction handling does not support SAVEPOINT properly;
+# let SQLAlchemy emit BEGIN itself so per-test savepoints work
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _emit_sqlite_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+async def _create_async_schema():
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+
+async def _clear_async_tables():
+    async with async_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            await connection.execute(delete(table))
+
 
 @pytest.fixture(scope="session")
-def event_loop():
-    """Create an instance of the default event loop for the test session."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+def db_schema():
+    """Create the database schemas once for the test session."""
+    Base.metadata.create_all(bind=engine)
+    asyncio.run(_create_async_schema())
+    yield
 
 @pytest.fixture
-def db_session():
-    """Create a fresh database session for each test."""
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+def db_session(db_schema):
+    """Create a database session whose changes are rolled back after each test."""
+    connection = engine.connect()
+    transaction = connection.begin()
+    # Commits inside the test only release savepoints of the outer transaction
+    db = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield db
     finally:
         db.close()
-        Base.metadata.drop_all(bind=engine)
+        transaction.rollback()
+        connection.close()
+
+@pytest.fixture(scope="session")
+def app_client(db_schema):
+    """Create one test client for the session so app startup/shutdown run once."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def async_session_factory(db_schema):
+    """Hand out async sessions on the test database and empty it after the test."""
+    yield TestingAsyncSessionLocal
+    asyncio.run(_clear_async_tables())
+    # The cached demo user was just deleted with everything else
+    symptom_api._demo_user_cache = None
 
 @pytest.fixture
-def client(db_session):
-    """Create a test client with database dependency override."""
+def client(app_client, db_session, async_session_factory, monkeypatch):
+    """Shared test client with the database dependencies bound to the test databases."""
     def override_get_db():
         try:
             yield db_session
         finally:
             db_session.close()
     
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
+    
+    # Write symptom history through the request session so rows are
+    # visible as soon as the response arrives
+    monkeypatch.setattr(symptom_api, "_symptom_record_queue", None)
+    
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as test_client:
-        yield test_client
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    yield app_client
     app.dependency_overrides.clear()
 
 @pytest.fixture
-def sample_user(db_session):
-    """Create a sample user for testing."""
-    user = User(
-        firebase_uid="test_uid_123",
-        email="test@example.com",
-        display_name="Test User"
-    )
-    db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
-    return user
+def async_user(async_session_factory):
+    """Sample user stored in the async test database."""
+    async def create_user():
+        async with async_session_factory() as session:
+            user = User(
+                id=str(uuid.uuid4()),
+                firebase_uid="async_uid_123",
+                email="async@example.com",
+                display_name="Async User",
+                email_verified=True
+            )
+            session.add(user)
+            await session.commit()
+            # Reload so column values look the way the database returns them
+            await session.refresh(user)
+            return user
+    
+    return asyncio.run(create_user())
 
 @pytest.fixture
-def sample_conversation(db_session, sample_user):
-    """Create a sample conversation for testing."""
-    conversation = Conversation(
-        user_id=sample_user.id,
-        title="Test Conversation",
-        consultation_type="general"
+def seed_data(db_session):
+    """Insert the shared sample rows in a single transaction and return their IDs."""
+    ids = SimpleNamespace(
+        user_id=str(uuid.uuid4()),
+        conversation_id=str(uuid.uuid4()),
+        message_id=str(uuid.uuid4()),
+        medical_record_id=str(uuid.uuid4())
     )
-    db_session.add(conversation)
+    db_session.bulk_insert_mappings(User, [{
+        "id": ids.user_id,
+        "firebase_uid": "test_uid_123",
+        "email": "test@example.com",
+        "display_name": "Test User"
+    }])
+    db_session.bulk_insert_mappings(Conversation, [{
+        "id": ids.conversation_id,
+        "user_id": ids.user_id,
+        "title": "Test Conversation",
+        "consultation_type": "general"
+    }])
+    db_session.bulk_insert_mappings(Message, [{
+        "id": ids.message_id,
+        "conversation_id": ids.conversation_id,
+        "content": "Test message content",
+        "sender": "user"
+    }])
+    db_session.bulk_insert_mappings(MedicalRecord, [{
+        "id": ids.medical_record_id,
+        "user_id": ids.user_id,
+        "record_type": "visit",
+        "title": "Annual Checkup",
+        "description": "Routine annual physical examination",
+        "date_recorded": datetime(2024, 1, 15),
+        "healthcare_provider": "Dr. Smith"
+    }])
     db_session.commit()
-    db_session.refresh(conversation)
-    return conversation
+    return ids
 
 @pytest.fixture
-def sample_message(db_session, sample_conversation):
-    """Create a sample message for testing."""
-    message = Message(
-        conversation_id=sample_conversation.id,
-        content="Test message content",
-        sender="user"
-    )
-    db_session.add(message)
-    db_session.commit()
-    db_session.refresh(message)
-    return message
+def sample_user(db_session, seed_data):
+    """Sample user for testing."""
+    return db_session.get(User, seed_data.user_id)
 
 @pytest.fixture
-def sample_medical_record(db_session, sample_user):
-    """Create a sample medical record for testing."""
-    record = MedicalRecord(
-        user_id=sample_user.id,
-        record_type="visit",
-        title="Annual Checkup",
-        description="Routine annual physical examination",
-        date_recorded="2024-01-15",
-        healthcare_provider="Dr. Smith"
-    )
-    db_session.add(record)
-    db_session.commit()
-    db_session.refresh(record)
-    return record
\ No newline at end of file
+def sample_conversation(db_session, seed_data):
+    """Sample conversation for testing."""
+    return db_session.get(Conversation, seed_data.conversation_id)
+
+@pytest.fixture
+def sample_message(db_session, seed_data):
+    """Sample message for testing."""
+    return db_session.get(Message, seed_data.message_id)
+
+@pytest.fixture
+def sample_medical_record(db_session, seed_data):
+    """Sample medical record for testing."""
+    return db_session.get(MedicalRecord, seed_data.medical_record_id)
@@ -1,3 +1,5 @@
+import asyncio
+from datetime import datetime
 import pytest
 from fastapi.testclient import TestClient
 
@@ -92,4 +94,334 @@ class TestHealthAnalyticsEndpoints:
         response = client.get("/health-analytics", headers=headers)
         assert response.status_code == 200
         assert "consultation_stats" in response.json()
-        assert "health_trends" in response.json()
\ No newline at end of file
+        assert "health_trends" in response.json()
+
+
+class TestSymptomRecordWriter:
+    """Test the batched symptom history writer."""
+    
+    @pytest.fixture
+    def saved_batches(self, monkeypatch):
+        """Capture batches instead of inserting them into the database."""
+        import symptom_api
+        batches = []
+        
+        async def fake_insert(rows):
+            batches.append(list(rows))
+        
+        monkeypatch.setattr(symptom_api, "_insert_symptom_records", fake_insert)
+        return batches
+    
+    @pytest.mark.asyncio
+    async def test_cancel_flushes_pending_rows(self, saved_batches):
+        """Test that cancelling mid-batch finishes and flushes every queued row."""
+        import symptom_api
+        task = asyncio.create_task(symptom_api.symptom_record_writer())
+        await asyncio.sleep(0)
+        queue = symptom_api._symptom_record_queue
+        queue.put_nowait({"n": 1})
+        await asyncio.sleep(0)
+        # Deliver a row and the cancellation in the same tick
+        queue.put_nowait({"n": 2})
+        task.cancel()
+        
+        done, _ = await asyncio.wait({task}, timeout=2)
+        assert task in done and task.cancelled()
+        assert saved_batches == [[{"n": 1}, {"n": 2}]]
+        assert symptom_api._symptom_record_queue is None
+    
+    @pytest.mark.asyncio
+    async def test_stop_flushes_pending_rows(self, saved_batches):
+        """Test that stopping the writer flushes queued rows and exits."""
+        import symptom_api
+        task = asyncio.create_task(symptom_api.symptom_record_writer())
+        await asyncio.sleep(0)
+        for n in range(3):
+            symptom_api._symptom_record_queue.put_nowait({"n": n})
+        
+        await asyncio.wait_for(symptom_api.stop_symptom_record_writer(task), timeout=2)
+        assert task.done()
+        assert saved_batches == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+
+class TestUserProfileValidation:
+    """Test user profile update validation."""
+    
+    @pytest.mark.parametrize("date_of_birth", ["1990-02-30", "2001-13-01", "1999-02-29", "not-a-date"])
+    def test_rejects_invalid_date_of_birth(self, date_of_birth):
+        """Test that impossible calendar dates are rejected, not only bad formats."""
+        from pydantic import ValidationError
+        from user_api import UserProfileUpdate
+        with pytest.raises(ValidationError):
+            UserProfileUpdate(date_of_birth=date_of_birth)
+    
+    @pytest.mark.parametrize("date_of_birth", ["2000-02-29", "2020-05-01T10:00:00Z"])
+    def test_accepts_valid_date_of_birth(self, date_of_birth):
+        """Test that real ISO dates and timestamps are accepted."""
+        from user_api import UserProfileUpdate
+        assert UserProfileUpdate(date_of_birth=date_of_birth).date_of_birth == date_of_birth
+
+class TestUserDataExport:
+    """Test the user data export."""
+    
+    @pytest.mark.asyncio
+    async def test_export_contains_decrypted_profile(self, monkeypatch):
+        """Test that encrypted profile fields are exported as plaintext."""
+        import orjson
+        import user_api
+        from models import User
+        user = User(
+            firebase_uid="export_uid",
+            email="export@example.com",
+            phone_number="+15551234567",
+            date_of_birth="1990-01-02",
+            emergency_contact={"name": "Contact"},
+            medical_info={"allergies": ["penicillin"]}
+        )
+        user.encrypt_sensitive_data()
+        assert user.phone_encrypted
+        monkeypatch.setattr(user_api, "_user_conversations_with_messages", lambda user_id: iter([]))
+        
+        response = await user_api.export_user_data(format="json", current_user=user)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        profile = orjson.loads(body)["user_profile"]
+        assert profile["phone"] == "+15551234567"
+        assert profile["date_of_birth"] == "1990-01-02"
+        assert profile["emergency_contact"] == {"name": "Contact"}
+        assert profile["medical_info"] == {"allergies": ["penicillin"]}
+
+class TestUserAccountEndpoints:
+    """Test user account endpoints."""
+    
+    @pytest.mark.asyncio
+    async def test_missing_user_returns_404(self):
+        """Test that a user missing from the session is reported as 404, not 500."""
+        from fastapi import HTTPException
+        import user_api
+        from models import User
+        
+        class MissingUserSession:
+            async def get(self, model, ident):
+                return None
+            
+            async def rollback(self):
+                pass
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await user_api.deactivate_user_account(
+                current_user=User(id="missing-user"), db=MissingUserSession()
+            )
+        assert exc_info.value.status_code == 404
+
+class TestSanitizeText:
+    """Test text sanitization against the original per-pattern implementation."""
+    
+    CORPUS = [
+        "I have had a headache and a fever for 2 days",
+        "Can I take ibuprofen with warfarin?",
+        "SELECTonerror =1union",
+        "or 1=1",
+        "admin' -- comment",
+        "onerror=alert(1)",
+        "<script>alert(1)</script>onload =1",
+        "selectjavascript:javascript:orSELECT--<meta>onFILTERED  \"SELECT",
+        "\"selectjavascript:b<style>SELECT\ton:=",
+        "xp_cmdshellonerror=1<link>onload*/=1/_",
+        "<iframe src=x></iframe> and 'a'='a'",
+        "café union\x00 select\t\n  drop",
+    ]
+    
+    @staticmethod
+    def reference_sanitize(text: str) -> str:
+        """The original sanitize_text: one replacement pass per pattern, in order."""
+        import re
+        from validation import SQL_INJECTION_PATTERNS, XSS_PATTERNS
+        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+        for pattern in SQL_INJECTION_PATTERNS + XSS_PATTERNS:
+            text = re.sub(pattern.pattern, '[FILTERED]', text, flags=re.IGNORECASE)
+        return re.sub(r'\s+', ' ', text.strip())
+    
+    @pytest.mark.parametrize("text", CORPUS)
+    def test_matches_reference_implementation(self, text):
+        """Test that the fused prefilter never changes the sanitized output."""
+        from validation import sanitize_text
+        assert sanitize_text(text) == self.reference_sanitize(text)
+    
+    @pytest.mark.parametrize("text", [
+        "or\u00a01=1", "and\u00851 = 1", "or 1=\u0661", "onclick\u00a0=alert(1)",
+        "onload\u2003=x", "un\u0131on", "\u017felect * from users"
+    ])
+    def test_fused_scanners_match_individual_patterns(self, text):
+        """Test that the fused gates agree with the per-pattern check on Unicode input."""
+        from validation import (
+            SQL_INJECTION_PATTERNS, XSS_PATTERNS, sanitize_text,
+            validate_no_sql_injection, validate_no_xss, _pattern_scanner
+        )
+        sql_hit = any(pattern.search(text) for pattern in SQL_INJECTION_PATTERNS)
+        xss_hit = any(pattern.search(text) for pattern in XSS_PATTERNS)
+        assert sql_hit or xss_hit
+        assert bool(_pattern_scanner(text).search(text)) == (sql_hit or xss_hit)
+        assert validate_no_sql_injection(text) == (not sql_hit)
+        assert validate_no_xss(text) == (not xss_hit)
+        assert sanitize_text(text) == self.reference_sanitize(text)
+
+class TestSymptomCheckerEndpoints:
+    """Test the async symptom checker endpoints."""
+    
+    SYMPTOMS = {"symptoms": ["headache", "fever"], "severity_rating": 6, "duration": "2 days"}
+    
+    def analyze(self, client: TestClient) -> dict:
+        response = client.post("/symptoms/analyze", json=self.SYMPTOMS)
+        assert response.status_code == 200
+        return response.json()
+    
+    def test_analyze_saves_history(self, client: TestClient):
+        """Test that an analysis is returned and saved to the history."""
+        analysis = self.analyze(client)
+        assert "urgency_score" in analysis
+        
+        response = client.get("/symptoms/history")
+        assert response.status_code == 200
+        history = response.json()
+        assert len(history) == 1
+        assert history[0]["symptoms"] == ["headache", "fever"]
+    
+    def test_insights(self, client: TestClient):
+        """Test insights over the saved history."""
+        self.analyze(client)
+        response = client.get("/symptoms/insights")
+        assert response.status_code == 200
+        assert response.json()["total_symptom_records"] == 1
+    
+    @pytest.mark.parametrize("export_format", ["json", "csv"])
+    def test_export(self, client: TestClient, export_format):
+        """Test exporting the saved history."""
+        self.analyze(client)
+        response = client.get("/symptoms/export", params={"format": export_format})
+        assert response.status_code == 200
+        assert "headache" in response.text
+    
+    def test_delete_history_record(self, client: TestClient):
+        """Test deleting a saved history record."""
+        self.analyze(client)
+        record_id = client.get("/symptoms/history").json()[0]["record_id"]
+        
+        assert client.delete(f"/symptoms/history/{record_id}").status_code == 200
+        assert client.delete(f"/symptoms/history/{record_id}").status_code == 404
+    
+    def test_refresh_demo_user(self, client: TestClient):
+        """Test reloading the cached demo user."""
+        response = client.post("/symptoms/internal/refresh-user")
+        assert response.status_code == 200
+        assert response.json()["user_id"]
+    
+    def test_binds_naive_utc_datetimes(self, client: TestClient):
+        """Test that timestamps and date filters are bound as naive UTC, as the DateTime columns need with asyncpg."""
+        from sqlalchemy import event
+        import database
+        bound = []
+        
+        def capture_datetimes(conn, cursor, statement, parameters, context, executemany):
+            for compiled_parameters in context.compiled_parameters:
+                bound.extend(v for v in compiled_parameters.values() if isinstance(v, datetime))
+        
+        sync_engine = database.async_engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", capture_datetimes)
+        try:
+            self.analyze(client)
+            aware_from = "2000-01-01T05:00:00+05:00"
+            history = client.get("/symptoms/history", params={"date_from": aware_from})
+            assert len(history.json()) == 1
+            assert client.get("/symptoms/insights").json()["total_symptom_records"] == 1
+            export = client.get("/symptoms/export", params={"format": "json", "date_from": aware_from})
+            assert len(export.json()["symptom_records"]) == 1
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", capture_datetimes)
+        
+        assert datetime(2000, 1, 1) in bound
+        assert all(value.tzinfo is None for value in bound)
+
+class TestUserEndpoints:
+    """Test the async user profile endpoints."""
+    
+    @pytest.fixture
+    def user_client(self, client: TestClient, async_user):
+        """Test client authenticated as the async test user."""
+        from auth_middleware import require_auth
+        from main import app
+        app.dependency_overrides[require_auth] = lambda: async_user
+        return client
+    
+    def test_get_profile(self, user_client: TestClient, async_user):
+        """Test reading the profile."""
+        response = user_client.get("/user/profile")
+        assert response.status_code == 200
+        assert response.json()["email"] == async_user.email
+    
+    def test_update_profile(self, user_client: TestClient):
+        """Test updating the profile."""
+        response = user_client.put("/user/profile", json={"display_name": "Updated Name"})
+        assert response.status_code == 200
+        assert response.json()["display_name"] == "Updated Name"
+    
+    def test_get_stats(self, user_client: TestClient):
+        """Test reading account statistics."""
+        response = user_client.get("/user/stats")
+        assert response.status_code == 200
+        assert response.json()["total_conversations"] == 0
+    
+    def test_deactivate_and_reactivate(self, user_client: TestClient):
+        """Test deactivating and reactivating the account."""
+        assert user_client.post("/user/deactivate").status_code == 200
+        assert user_client.post("/user/reactivate").status_code == 200
+    
+    def test_delete_account(self, user_client: TestClient):
+        """Test deleting the account."""
+        response = user_client.delete("/user/account")
+        assert response.status_code == 200
+        assert user_client.post("/user/deactivate").status_code == 404
+
+
+class TestRedFlagDetection:
+    """Test red flag detection on normalized symptom text."""
+    
+    @pytest.mark.parametrize("symptom, expected", [
+        ("severe-bleeding", "severe bleeding"),
+        ("chest pain/shortness of breath", "chest pain with sweating"),
+        ("vomiting-blood", "vomiting blood"),
+    ])
+    def test_joined_words_are_flagged(self, symptom, expected):
+        """Test that hyphen- and slash-joined symptoms still raise red flags."""
+        from symptom_analyzer import SymptomAnalyzer, SymptomInput, normalize_symptom_text
+        
+        analyzer = SymptomAnalyzer()
+        red_flags = analyzer._identify_red_flags(
+            SymptomInput(symptoms=[normalize_symptom_text(symptom)])
+        )
+        assert expected in red_flags
+
+
+class TestDatabaseStatistics:
+    """Test database statistics collection."""
+    
+    @pytest.mark.parametrize("exact", [True, False])
+    def test_table_counts(self, exact):
+        """Test that table counts reflect the stored rows."""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from database import Base, DatabaseManager
+        from models import User
+        
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.engine = create_engine("sqlite://")
+        manager.SessionLocal = sessionmaker(bind=manager.engine)
+        Base.metadata.create_all(bind=manager.engine)
+        with manager.SessionLocal() as session:
+            session.bulk_insert_mappings(User, [
+                {"id": f"user-{n}", "firebase_uid": f"uid-{n}", "email": f"user{n}@example.com"}
+                for n in range(3)
+            ])
+            session.commit()
+        
+        table_counts = manager.get_database_statistics(exact=exact)["table_counts"]
+        assert table_counts["users"] == 3
+        assert table_counts["conversations"] == 0
@@ -3,21 +3,66 @@ User Profile Management API
 Handles user profile CRUD operations with authentication
 """
 
+import asyncio
+import csv
+import re
 from datetime import datetime
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, status, Request
-from pydantic import BaseModel, EmailStr, validator
-from sqlalchemy.orm import Session
+from io import StringIO
+from itertools import groupby
+from operator import itemgetter
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+import orjson
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, status, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, EmailStr, TypeAdapter, field_validator
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_async_db, create_session_factory
 from auth_middleware import require_auth, require_verified_email
-from models import User
+from models import User, Conversation, Message
 from encryption_service import (
     log_data_access, verify_data_ownership, audit_logger,
     privacy_control_service, data_retention_service
 )
 
-router = APIRouter(prefix="/user", tags=["user"])
+router = APIRouter(prefix="/user", tags=["user"], default_response_class=ORJSONResponse)
+
+VALID_GENDERS = frozenset({'male', 'female', 'other', 'prefer-not-to-say'})
+
+# ISO 8601 date with optional time and UTC offset
+ISO_DATE_PATTERN = re.compile(
+    r'^\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])'
+    r'(?:[T ](?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?$'
+)
+
+# Profile fields clients may update, mapped to the User columns they write
+UPDATABLE_PROFILE_COLUMNS = {
+    'display_name': 'display_name',
+    'phone': 'phone_number',
+    'date_of_birth': 'date_of_birth',
+    'gender': 'gender',
+    'emergency_contact': 'emergency_contact',
+    'medical_info': 'medical_info',
+    'preferences': 'preferences',
+    'privacy_settings': 'privacy_settings'
+}
+
+# Encryption flags of the sensitive User columns
+SENSITIVE_COLUMN_FLAGS = {
+    'phone_number': 'phone_encrypted',
+    'date_of_birth': 'date_of_birth_encrypted',
+    'emergency_contact': 'emergency_contact_encrypted',
+    'medical_info': 'medical_info_encrypted'
+}
+
+# Rows fetched per round trip when streaming data exports
+EXPORT_STREAM_BATCH_SIZE = 500
+
+USER_EXPORT_CSV_HEADER = [
+    "Conversation ID", "Conversation Started", "Consultation Type", "Status",
+    "Message ID", "Sequence Number", "Timestamp", "Sender", "Content"
+]
 
 # Pydantic models for request/response
 class UserProfileUpdate(BaseModel):
@@ -30,15 +75,21 @@ class UserProfileUpdate(BaseModel):
     preferences: Optional[Dict[str, Any]] = None
     privacy_settings: Optional[Dict[str, Any]] = None
 
-    @validator('gender')
+    @field_validator('gender')
+    @classmethod
     def validate_gender(cls, v):
-        if v and v not in ['male', 'female', 'other', 'prefer-not-to-say']:
+        if v and v not in VALID_GENDERS:
             raise ValueError('Invalid gender value')
         return v
 
-    @validator('date_of_birth')
+    @field_validator('date_of_birth')
+    @classmethod
     def validate_date_of_birth(cls, v):
         if v:
+            # The pattern rejects malformed input cheaply; fromisoformat still
+            # has to reject impossible calendar dates such as 1990-02-30
+            if not ISO_DATE_PATTERN.match(v):
+                raise ValueError('Invalid date format')
             try:
                 datetime.fromisoformat(v.replace('Z', '+00:00'))
             except ValueError:
@@ -71,41 +122,61 @@ class UserStatsResponse(BaseModel):
     email_verified: bool
     profile_completion: float
 
+async def _get_session_user(db: AsyncSession, current_user: User) -> User:
+    """Load the authenticated user into the request's async session for updates"""
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
+
+# Serializer built once at import rather than resolved per response
+_PROFILE_ADAPTER = TypeAdapter(UserProfileResponse)
+
+def _profile_response(user: User, decrypted_data: Dict[str, Any]) -> Response:
+    """Serialize the profile from trusted server-side data without re-validating it"""
+    profile = UserProfileResponse.model_construct(
+        firebase_uid=user.firebase_uid,
+        email=user.email,
+        display_name=user.display_name,
+        phone=decrypted_data.get('phone'),
+        date_of_birth=decrypted_data.get('date_of_birth'),
+        gender=user.gender,
+        email_verified=user.email_verified,
+        photo_url=user.photo_url,
+        emergency_contact=decrypted_data.get('emergency_contact'),
+        medical_info=decrypted_data.get('medical_info'),
+        preferences=user.preferences,
+        privacy_settings=user.privacy_settings,
+        created_at=user.created_at,
+        last_login=user.last_login,
+        is_active=user.is_active
+    )
+    return Response(_PROFILE_ADAPTER.dump_json(profile), media_type="application/json")
+
 @router.get("/profile", response_model=UserProfileResponse)
 async def get_user_profile(
     request: Request,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's profile information"""
     try:
-        # Log profile access
-        audit_logger.log_profile_access(
+        # Log profile access after the response is sent
+        background_tasks.add_task(
+            audit_logger.log_profile_access,
             user_id=current_user.firebase_uid,
             operation="read",
             ip_address=request.client.host if request.client else None
         )
         
-        # Decrypt sensitive data for display
-        decrypted_data = current_user.decrypt_sensitive_data()
+        # Decrypt sensitive data for display off the event loop
+        decrypted_data = await asyncio.to_thread(current_user.decrypt_sensitive_data)
         
-        return UserProfileResponse(
-            firebase_uid=current_user.firebase_uid,
-            email=current_user.email,
-            display_name=current_user.display_name,
-            phone=decrypted_data.get('phone'),
-            date_of_birth=decrypted_data.get('date_of_birth'),
-            gender=current_user.gender,
-            email_verified=current_user.email_verified,
-            photo_url=current_user.photo_url,
-            emergency_contact=decrypted_data.get('emergency_contact'),
-            medical_info=decrypted_data.get('medical_info'),
-            preferences=current_user.preferences,
-            privacy_settings=current_user.privacy_settings,
-            created_at=current_user.created_at,
-            last_login=current_user.last_login,
-            is_active=current_user.is_active
-        )
+        return _profile_response(current_user, decrypted_data)
     except Exception as e:
         print(f"❌ Error getting user profile: {e}")
         raise HTTPException(
@@ -117,62 +188,60 @@ async def get_user_profile(
 async def update_user_profile(
     request: Request,
     profile_update: UserProfileUpdate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(require_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user's profile information"""
     try:
-        # Log profile update
-        audit_logger.log_profile_access(
+        update_data = profile_update.dict(exclude_unset=True)
+        
+        # Log profile update after the response is sent
+        background_tasks.add_task(
+            audit_logger.log_profile_access,
             user_id=current_user.firebase_uid,
             operation="update",
-            fields_accessed=list(profile_update.dict(exclude_unset=True).keys()),
+            fields_accessed=list(update_data.keys()),
             ip_address=request.client.host if request.client else None
         )
         
-        # Update user fields
-        update_data = profile_update.dict(exclude_unset=True)
-        
-        for field, value in update_data.items():
-            if hasattr(current_user, field):
-                setattr(current_user, field, value)
-        
-        # Encrypt sensitive data if user has encryption enabled
-        if current_user.should_encrypt_data():
-            current_user.encrypt_sensitive_data()
-        
-        # Update timestamp
-        current_user.updated_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(current_user)
-        
-        print(f"✅ Updated profile for user: {current_user.email}")
+        user = await _get_session_user(db, current_user)
+        
+        if update_data:
+            # Update whitelisted user columns only
+            for field, value in update_data.items():
+                column = UPDATABLE_PROFILE_COLUMNS.get(field)
+                if column is None:
+                    continue
+                setattr(user, column, value)
+                
+                # A new value is plaintext until it is encrypted below
+                encrypted_flag = SENSITIVE_COLUMN_FLAGS.get(column)
+                if encrypted_flag:
+                    setattr(user, encrypted_flag, False)
+            
+            # Encrypt sensitive data if user has encryption enabled
+            if user.should_encrypt_data():
+                await asyncio.to_thread(user.encrypt_sensitive_data)
+            
+            # Update timestamp
+            user.updated_at = datetime.utcnow()
+            
+            await db.commit()
+            await db.refresh(user)
+            
+            print(f"✅ Updated profile for user: {user.email}")
         
         # Return decrypted data for display
-        decrypted_data = current_user.decrypt_sensitive_data()
+        decrypted_data = await asyncio.to_thread(user.decrypt_sensitive_data)
         
-        return UserProfileResponse(
-            firebase_uid=current_user.firebase_uid,
-            email=current_user.email,
-            display_name=current_user.display_name,
-            phone=decrypted_data.get('phone'),
-            date_of_birth=decrypted_data.get('date_of_birth'),
-            gender=current_user.gender,
-            email_verified=current_user.email_verified,
-            photo_url=current_user.photo_url,
-            emergency_contact=decrypted_data.get('emergency_contact'),
-            medical_info=decrypted_data.get('medical_info'),
-            preferences=current_user.preferences,
-            privacy_settings=current_user.privacy_settings,
-            created_at=current_user.created_at,
-            last_login=current_user.last_login,
-            is_active=current_user.is_active
-        )
+        return _profile_response(user, decrypted_data)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error updating user profile: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update user profile"
@@ -181,46 +250,33 @@ async def update_user_profile(
 @router.get("/stats", response_model=UserStatsResponse)
 async def get_user_stats(
     current_user: User = Depends(require_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user statistics and account information"""
     try:
-        from models import Conversation, Message
-        from sqlalchemy import func
-        
-        # Get conversation stats
-        total_conversations = db.query(Conversation).filter(
-            Conversation.user_id == current_user.id
-        ).count()
-        
-        # Get message stats
-        total_messages = db.query(Message).join(Conversation).filter(
-            Conversation.user_id == current_user.id,
-            Message.sender == "user"
-        ).count()
-        
-        # Get last consultation
-        last_conversation = db.query(Conversation).filter(
-            Conversation.user_id == current_user.id
-        ).order_by(Conversation.last_message_at.desc()).first()
-        
-        last_consultation = last_conversation.last_message_at if last_conversation else None
+        # Get conversation count, user message count, last consultation and
+        # profile completion in one query
+        profile_completion = select(User.profile_completion).where(
+            User.id == current_user.id
+        ).scalar_subquery()
+        result = await db.execute(
+            select(
+                func.count(Conversation.id.distinct()),
+                func.count(Message.id),
+                func.max(Conversation.last_message_at),
+                profile_completion
+            ).select_from(Conversation).outerjoin(
+                Message,
+                and_(Message.conversation_id == Conversation.id, Message.sender == "user")
+            ).where(
+                Conversation.user_id == current_user.id
+            )
+        )
+        total_conversations, total_messages, last_consultation, profile_completion = result.one()
         
         # Calculate account age
         account_age = (datetime.utcnow() - current_user.created_at).days
         
-        # Calculate profile completion
-        profile_fields = [
-            current_user.display_name,
-            current_user.phone,
-            current_user.date_of_birth,
-            current_user.gender,
-            current_user.emergency_contact,
-            current_user.medical_info
-        ]
-        completed_fields = sum(1 for field in profile_fields if field)
-        profile_completion = (completed_fields / len(profile_fields)) * 100
-        
         return UserStatsResponse(
             total_consultations=total_conversations,
             total_messages=total_messages,
@@ -241,34 +297,43 @@ async def get_user_stats(
 @router.delete("/account")
 async def delete_user_account(
     current_user: User = Depends(require_verified_email),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete user account and all associated data"""
     try:
-        from models import Conversation, Message
-        
-        # Delete all user's conversations and messages (cascade should handle this)
-        conversations = db.query(Conversation).filter(
+        # Delete all user's messages and conversations in bulk rather than
+        # loading each conversation to cascade per row
+        user_conversation_ids = select(Conversation.id).where(
             Conversation.user_id == current_user.id
-        ).all()
-        
-        for conversation in conversations:
-            db.delete(conversation)
+        )
+        await db.execute(
+            delete(Message)
+            .where(Message.conversation_id.in_(user_conversation_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(Conversation)
+            .where(Conversation.user_id == current_user.id)
+            .execution_options(synchronize_session=False)
+        )
         
         # Delete user
-        db.delete(current_user)
-        db.commit()
+        user = await _get_session_user(db, current_user)
+        await db.delete(user)
+        await db.commit()
         
         print(f"✅ Deleted account for user: {current_user.email}")
         
         return {
             "message": "Account deleted successfully",
-            "deleted_at": datetime.utcnow().isoformat()
+            "deleted_at": datetime.utcnow()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error deleting user account: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete user account"
@@ -277,25 +342,30 @@ async def delete_user_account(
 @router.post("/deactivate")
 async def deactivate_user_account(
     current_user: User = Depends(require_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Deactivate user account (soft delete)"""
     try:
-        current_user.is_active = False
-        current_user.deactivated_at = datetime.utcnow()
+        user = await _get_session_user(db, current_user)
+        user.is_active = False
+        user.deactivated_at = datetime.utcnow()
+        # Set explicitly: the onupdate default is aware, which asyncpg rejects
+        user.updated_at = user.deactivated_at
         
-        db.commit()
+        await db.commit()
         
-        print(f"✅ Deactivated account for user: {current_user.email}")
+        print(f"✅ Deactivated account for user: {user.email}")
         
         return {
             "message": "Account deactivated successfully",
-            "deactivated_at": current_user.deactivated_at.isoformat()
+            "deactivated_at": user.deactivated_at
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error deactivating user account: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to deactivate user account"
@@ -304,41 +374,127 @@ async def deactivate_user_account(
 @router.post("/reactivate")
 async def reactivate_user_account(
     current_user: User = Depends(require_auth),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reactivate user account"""
     try:
-        current_user.is_active = True
-        current_user.deactivated_at = None
-        current_user.last_login = datetime.utcnow()
+        user = await _get_session_user(db, current_user)
+        user.is_active = True
+        user.deactivated_at = None
+        user.last_login = datetime.utcnow()
+        # Set explicitly: the onupdate default is aware, which asyncpg rejects
+        user.updated_at = user.last_login
         
-        db.commit()
+        await db.commit()
         
-        print(f"✅ Reactivated account for user: {current_user.email}")
+        print(f"✅ Reactivated account for user: {user.email}")
         
         return {
             "message": "Account reactivated successfully",
-            "reactivated_at": datetime.utcnow().isoformat()
+            "reactivated_at": datetime.utcnow()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error reactivating user account: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to reactivate user account"
         )
 
+def _user_conversations_with_messages(user_id: str) -> Iterator[Tuple[Conversation, List[Message]]]:
+    """Yield a user's conversations with their ordered messages, one at a time"""
+    SessionLocal = create_session_factory()
+    db = SessionLocal()
+    try:
+        # One ordered join instead of a message query per conversation
+        rows = db.execute(
+            select(Conversation, Message)
+            .outerjoin(Message, Message.conversation_id == Conversation.id)
+            .where(Conversation.user_id == user_id)
+            .order_by(Conversation.started_at, Conversation.id, Message.sequence_number)
+            .execution_options(yield_per=EXPORT_STREAM_BATCH_SIZE)
+        )
+        
+        for conversation, conversation_rows in groupby(rows, key=itemgetter(0)):
+            yield conversation, [message for _, message in conversation_rows if message is not None]
+    finally:
+        db.close()
+
+def _conversation_export(conversation: Conversation, messages: List[Message]) -> Dict[str, Any]:
+    """Build the export representation of a conversation"""
+    return {
+        "id": conversation.id,
+        "started_at": conversation.started_at,
+        "last_message_at": conversation.last_message_at,
+        "status": conversation.status,
+        "consultation_type": conversation.consultation_type,
+        "primary_concern": conversation.primary_concern,
+        "context_summary": conversation.context_summary,
+        "messages": [
+            {
+                "id": msg.id,
+                "content": msg.content,
+                "sender": msg.sender,
+                "timestamp": msg.timestamp,
+                "sequence_number": msg.sequence_number
+            }
+            for msg in messages
+        ]
+    }
+
+def _stream_user_export_json(user_id: str, user_profile: Dict[str, Any], export_metadata: Dict[str, Any]):
+    """Yield the JSON export incrementally, one conversation per chunk"""
+    yield b'{"user_profile":' + orjson.dumps(user_profile) + b',"conversations":['
+    
+    total_conversations = 0
+    for conversation, messages in _user_conversations_with_messages(user_id):
+        if total_conversations:
+            yield b","
+        yield orjson.dumps(_conversation_export(conversation, messages))
+        total_conversations += 1
+    
+    export_metadata = {**export_metadata, "total_conversations": total_conversations}
+    yield b'],"export_metadata":' + orjson.dumps(export_metadata) + b"}"
+
+def _stream_user_export_csv(user_id: str):
+    """Yield the CSV export incrementally, one conversation's messages per chunk"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(USER_EXPORT_CSV_HEADER)
+    
+    for conversation, messages in _user_conversations_with_messages(user_id):
+        conversation_columns = [
+            conversation.id,
+            conversation.started_at.isoformat(),
+            conversation.consultation_type,
+            conversation.status
+        ]
+        if not messages:
+            writer.writerow(conversation_columns + [""] * 5)
+        for msg in messages:
+            writer.writerow(conversation_columns + [
+                msg.id,
+                msg.sequence_number,
+                msg.timestamp.isoformat(),
+                msg.sender,
+                msg.content
+            ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    
+    yield buffer.getvalue()
+
 @router.get("/data-export")
 async def export_user_data(
     format: str = "json",
-    current_user: User = Depends(require_verified_email),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(require_verified_email)
 ):
     """Export all user data in specified format"""
     try:
-        from models import Conversation, Message
-        
         # Validate format
         valid_formats = ['json', 'csv']
         if format not in valid_formats:
@@ -347,64 +503,45 @@ async def export_user_data(
                 detail=f"Invalid format. Supported formats: {valid_formats}"
             )
         
-        # Get all user data
-        conversations = db.query(Conversation).filter(
-            Conversation.user_id == current_user.id
-        ).all()
+        exported_at = datetime.utcnow()
+        filename = f"user_data_export_{exported_at.strftime('%Y%m%d')}.{format}"
         
-        user_data = {
-            "user_profile": {
-                "firebase_uid": current_user.firebase_uid,
-                "email": current_user.email,
-                "display_name": current_user.display_name,
-                "phone": current_user.phone,
-                "date_of_birth": current_user.date_of_birth,
-                "gender": current_user.gender,
-                "emergency_contact": current_user.emergency_contact,
-                "medical_info": current_user.medical_info,
-                "preferences": current_user.preferences,
-                "privacy_settings": current_user.privacy_settings,
-                "created_at": current_user.created_at.isoformat(),
-                "last_login": current_user.last_login.isoformat() if current_user.last_login else None
-            },
-            "conversations": [],
-            "export_metadata": {
-                "exported_at": datetime.utcnow().isoformat(),
-                "format": format,
-                "total_conversations": len(conversations)
-            }
-        }
+        print(f"✅ Exporting data for user: {current_user.email}")
         
-        # Add conversation data
-        for conversation in conversations:
-            messages = db.query(Message).filter(
-                Message.conversation_id == conversation.id
-            ).order_by(Message.sequence_number).all()
-            
-            conversation_data = {
-                "id": conversation.id,
-                "started_at": conversation.started_at.isoformat(),
-                "last_message_at": conversation.last_message_at.isoformat(),
-                "status": conversation.status,
-                "consultation_type": conversation.consultation_type,
-                "primary_concern": conversation.primary_concern,
-                "context_summary": conversation.context_summary,
-                "messages": [
-                    {
-                        "id": msg.id,
-                        "content": msg.content,
-                        "sender": msg.sender,
-                        "timestamp": msg.timestamp.isoformat(),
-                        "sequence_number": msg.sequence_number
-                    }
-                    for msg in messages
-                ]
-            }
-            user_data["conversations"].append(conversation_data)
+        # Stream conversations so the export is never built in memory
+        if format == "csv":
+            return StreamingResponse(
+                _stream_user_export_csv(current_user.id),
+                media_type="text/csv",
+                headers={"Content-Disposition": f"attachment; filename={filename}"}
+            )
         
-        print(f"✅ Exported data for user: {current_user.email}")
+        # Export the user's own data, never the stored ciphertext
+        decrypted_data = await asyncio.to_thread(current_user.decrypt_sensitive_data)
+        user_profile = {
+            "firebase_uid": current_user.firebase_uid,
+            "email": current_user.email,
+            "display_name": current_user.display_name,
+            "phone": decrypted_data.get('phone'),
+            "date_of_birth": decrypted_data.get('date_of_birth'),
+            "gender": current_user.gender,
+            "emergency_contact": decrypted_data.get('emergency_contact'),
+            "medical_info": decrypted_data.get('medical_info'),
+            "preferences": current_user.preferences,
+            "privacy_settings": current_user.privacy_settings,
+            "created_at": current_user.created_at,
+            "last_login": current_user.last_login
+        }
+        export_metadata = {
+            "exported_at": exported_at,
+            "format": format
+        }
         
-        return user_data
+        return StreamingResponse(
+            _stream_user_export_json(current_user.id, user_profile, export_metadata),
+            media_type="application/json",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
         
     except HTTPException:
         raise
@@ -413,4 +550,4 @@ async def export_user_data(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to export user data"
-        )
\ No newline at end of file
+        )
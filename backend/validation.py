@@ -1,8 +1,9 @@
 import re
 import bleach
 import html
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, validator, Field
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,7 @@ ALLOWED_ATTRIBUTES = {
 }
 
 # SQL injection patterns to detect
-SQL_INJECTION_PATTERNS = [
+SQL_INJECTION_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
     r'(\b(union|select|insert|update|delete|drop|create|alter|exec|execute)\b)',
     r'(\b(or|and)\s+\d+\s*=\s*\d+)',
     r'(\b(or|and)\s+[\'"]?\w+[\'"]?\s*=\s*[\'"]?\w+[\'"]?)',
@@ -24,10 +25,10 @@ SQL_INJECTION_PATTERNS = [
     r'(\bsp_executesql\b)',
     r'(\bsysobjects\b)',
     r'(\bsyscolumns\b)'
-]
+]]
 
 # XSS patterns to detect
-XSS_PATTERNS = [
+XSS_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
     r'<script[^>]*>.*?</script>',
     r'javascript:',
     r'on\w+\s*=',
@@ -37,7 +38,93 @@ XSS_PATTERNS = [
     r'<link[^>]*>',
     r'<meta[^>]*>',
     r'<style[^>]*>.*?</style>'
-]
+]]
+
+# Character class and format patterns used by the validators
+_CTRL_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}\Z', re.ASCII)
+
+
+
+def _compile_scanner(source: str):
+    """Compile a fused case-insensitive alternation"""
+    # Stays on stdlib re: RE2's \s, \d, \b and case folding are narrower than
+    # Python's Unicode rules, so the fused gate would miss inputs such as
+    # "or\u00a01=1" that the individual patterns catch
+    return re.compile(source, re.IGNORECASE)
+
+
+# Hex digits deleted by bytes.translate when checking UUIDs
+_UUID_HEX_DIGITS = b'0123456789abcdefABCDEF'
+
+
+def _is_uuid(value: str) -> bool:
+    """Check for the 8-4-4-4-12 hex UUID layout without a regex"""
+    if len(value) != 36 or not value.isascii():
+        return False
+    raw = value.encode('ascii')
+    # Deleting every hex digit must leave exactly the four dashes, in place
+    return raw.translate(None, _UUID_HEX_DIGITS) == b'----' and raw[8] == raw[13] == raw[18] == raw[23] == 45
+
+
+# Each pattern family fused into one alternation so a check is a single scan
+_SQL_INJECTION_RE = _compile_scanner('|'.join(pattern.pattern for pattern in SQL_INJECTION_PATTERNS))
+_XSS_RE = _compile_scanner('|'.join(pattern.pattern for pattern in XSS_PATTERNS))
+
+# Every pattern, in the order sanitize_text applies them
+_MALICIOUS_PATTERNS = (
+    [("SQL injection", pattern) for pattern in SQL_INJECTION_PATTERNS] +
+    [("XSS", pattern) for pattern in XSS_PATTERNS]
+)
+
+# All patterns fused so detecting any of them is a single scan
+_MALICIOUS_RE = _compile_scanner('|'.join(pattern.pattern for _, pattern in _MALICIOUS_PATTERNS))
+
+# Every pattern except the bare SQL keyword ones needs one of these characters,
+# so text without any of them only has to be scanned for the keywords
+_TRIGGER_CHARS = frozenset('<>=:-#/*')
+_KEYWORD_RE = _compile_scanner('|'.join(
+    pattern.pattern for _, pattern in _MALICIOUS_PATTERNS
+    if _TRIGGER_CHARS.isdisjoint(pattern.pattern)
+))
+
+
+def _pattern_scanner(text: str):
+    """Pick the fused alternation that can match anything in text"""
+    return _KEYWORD_RE if _TRIGGER_CHARS.isdisjoint(text) else _MALICIOUS_RE
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Strip text and collapse whitespace runs to single spaces"""
+    return ' '.join(text.split())
+
+
+# Sanitized results memoized for repeated texts (canned replies, greetings)
+SANITIZE_CACHE_SIZE = 4096
+SANITIZE_CACHE_MAX_LENGTH = 8192
+
+
+def _sanitize_uncached(text: str) -> Tuple[str, Tuple[str, ...]]:
+    """Sanitize text, returning it with the warnings for the patterns that fired"""
+    warnings = []
+    
+    # Remove null bytes and control characters
+    text = _CTRL_RE.sub('', text)
+    
+    # Clean text is ruled out with one fused scan. Otherwise each pattern is
+    # replaced in turn, because a replacement can create or break matches for
+    # the patterns after it and the output must not depend on the fusion.
+    if _pattern_scanner(text).search(text):
+        for kind, pattern in _MALICIOUS_PATTERNS:
+            text, count = pattern.subn('[FILTERED]', text)
+            if count:
+                warnings.append(f"Potential {kind} attempt detected: {pattern.pattern}")
+    
+    # Strip whitespace and remove excessive whitespace
+    return _normalize_whitespace(text), tuple(warnings)
+
+
+_sanitize_cached = lru_cache(maxsize=SANITIZE_CACHE_SIZE)(_sanitize_uncached)
 
 
 def sanitize_text(text: str) -> str:
@@ -45,29 +132,32 @@ def sanitize_text(text: str) -> str:
     if not text:
         return ""
     
-    # Remove null bytes and control characters
-    text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+    if len(text) > SANITIZE_CACHE_MAX_LENGTH:
+        sanitized, warnings = _sanitize_uncached(text)
+    else:
+        sanitized, warnings = _sanitize_cached(text)
     
-    # Remove potential SQL injection patterns
-    for pattern in SQL_INJECTION_PATTERNS:
-        if re.search(pattern, text, re.IGNORECASE):
-            logger.warning(f"Potential SQL injection attempt detected: {pattern}")
-            # Replace with safe placeholder
-            text = re.sub(pattern, '[FILTERED]', text, flags=re.IGNORECASE)
+    # Log on every call so cached attempts are still reported
+    for warning in warnings:
+        logger.warning(warning)
     
-    # Remove potential XSS patterns
-    for pattern in XSS_PATTERNS:
-        if re.search(pattern, text, re.IGNORECASE):
-            logger.warning(f"Potential XSS attempt detected: {pattern}")
-            text = re.sub(pattern, '[FILTERED]', text, flags=re.IGNORECASE)
-    
-    # Strip whitespace and normalize
-    text = text.strip()
+    return sanitized
+
+
+def _sanitize_request_text(text: str) -> Optional[str]:
+    """
+    Check and sanitize request text with a single pattern scan.
+    Returns None if the text contains SQL injection or XSS patterns.
+    """
+    if _pattern_scanner(text).search(text):
+        return None
     
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text)
+    stripped = _CTRL_RE.sub('', text)
+    if stripped != text:
+        # Removing control characters can join a pattern back together
+        return sanitize_text(stripped)
     
-    return text
+    return _normalize_whitespace(text)
 
 
 def validate_no_sql_injection(text: str) -> bool:
@@ -75,11 +165,9 @@ def validate_no_sql_injection(text: str) -> bool:
     if not text:
         return True
     
-    text_lower = text.lower()
-    for pattern in SQL_INJECTION_PATTERNS:
-        if re.search(pattern, text_lower, re.IGNORECASE):
-            return False
-    return True
+    if _TRIGGER_CHARS.isdisjoint(text):
+        return _KEYWORD_RE.search(text) is None
+    return _SQL_INJECTION_RE.search(text) is None
 
 
 def validate_no_xss(text: str) -> bool:
@@ -87,10 +175,36 @@ def validate_no_xss(text: str) -> bool:
     if not text:
         return True
     
-    for pattern in XSS_PATTERNS:
-        if re.search(pattern, text, re.IGNORECASE):
-            return False
-    return True
+    if _TRIGGER_CHARS.isdisjoint(text):
+        return True
+    return _XSS_RE.search(text) is None
+
+
+def _bounded_repr_length(value: Any, limit: int) -> int:
+    """
+    Length of str(value) for JSON-like data, built up piecewise so oversized
+    values stop early; any result above limit means the text exceeds it.
+    """
+    if isinstance(value, (dict, list)):
+        # Brackets plus ', ' between items
+        total = 2 + 2 * max(len(value) - 1, 0)
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if total > limit:
+                    break
+                total += _bounded_repr_length(key, limit - total) + 2  # ': '
+                total += _bounded_repr_length(item, limit - total)
+        else:
+            for item in value:
+                if total > limit:
+                    break
+                total += _bounded_repr_length(item, limit - total)
+        return total
+    
+    if isinstance(value, str) and len(value) > limit:
+        return len(value)  # repr adds quotes, so it only gets longer
+    
+    return len(repr(value))
 
 
 # Request/Response Models for Medical Chat
@@ -98,21 +212,17 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=2000, description="Chat message content")
     context: Optional[Dict[str, Any]] = Field(None, description="Optional conversation context")
     
-    @validator('message')
+    @field_validator('message')
+    @classmethod
     def validate_message(cls, v):
         if not v or not v.strip():
             raise ValueError('Message cannot be empty')
         
-        # Check for malicious patterns before sanitization
-        if not validate_no_sql_injection(v):
-            raise ValueError('Message contains potentially harmful content')
-        
-        if not validate_no_xss(v):
+        # Reject malicious patterns, otherwise sanitize the message
+        sanitized = _sanitize_request_text(v)
+        if sanitized is None:
             raise ValueError('Message contains potentially harmful content')
         
-        # Sanitize the message
-        sanitized = sanitize_text(v)
-        
         if len(sanitized) > 2000:
             raise ValueError('Message too long (max 2000 characters)')
         
@@ -122,11 +232,12 @@ class ChatRequest(BaseModel):
         
         return sanitized
     
-    @validator('context')
+    @field_validator('context')
+    @classmethod
     def validate_context(cls, v):
         if v is not None:
             # Limit context size
-            if len(str(v)) > 5000:
+            if _bounded_repr_length(v, 5000) > 5000:
                 raise ValueError('Context too large (max 5000 characters)')
             
             # Sanitize context values if they're strings
@@ -144,16 +255,20 @@ class ChatRequest(BaseModel):
 
 
 class ChatResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     reply: str = Field(..., description="AI response message")
     mood_analysis: Optional[Dict[str, Any]] = Field(None, description="Mood analysis results")
     suggestions: Optional[List[str]] = Field(None, description="AI suggestions")
     timestamp: str = Field(..., description="Response timestamp")
     
-    @validator('reply')
+    @field_validator('reply')
+    @classmethod
     def validate_reply(cls, v):
         return sanitize_text(v)
     
-    @validator('suggestions')
+    @field_validator('suggestions')
+    @classmethod
     def validate_suggestions(cls, v):
         if v:
             sanitized_suggestions = []
@@ -171,19 +286,22 @@ class ConversationCreateRequest(BaseModel):
     consultation_type: Optional[str] = Field("general", description="Type of medical consultation")
     initial_message: Optional[str] = Field(None, max_length=2000, description="Optional initial message")
     
-    @validator('consultation_type')
+    @field_validator('consultation_type')
+    @classmethod
     def validate_consultation_type(cls, v):
         valid_types = ['general', 'symptom_check', 'follow_up', 'emergency', 'medication_inquiry']
         if v not in valid_types:
             raise ValueError(f'Invalid consultation type. Must be one of: {", ".join(valid_types)}')
         return v
     
-    @validator('initial_message')
+    @field_validator('initial_message')
+    @classmethod
     def validate_initial_message(cls, v):
         if v:
-            if not validate_no_sql_injection(v) or not validate_no_xss(v):
+            sanitized = _sanitize_request_text(v)
+            if sanitized is None:
                 raise ValueError('Initial message contains invalid characters')
-            return sanitize_text(v)
+            return sanitized
         return v
 
 
@@ -193,39 +311,44 @@ class MessageSendRequest(BaseModel):
     conversation_id: str = Field(..., description="Conversation ID")
     message_type: Optional[str] = Field("text", description="Message type")
     
-    @validator('content')
+    @field_validator('content')
+    @classmethod
     def validate_content(cls, v):
         if not v or not v.strip():
             raise ValueError('Message content cannot be empty')
         
-        if not validate_no_sql_injection(v) or not validate_no_xss(v):
+        sanitized = _sanitize_request_text(v)
+        if sanitized is None:
             raise ValueError('Message contains invalid characters')
         
-        sanitized = sanitize_text(v)
         if len(sanitized) > 2000:
             raise ValueError('Message too long (max 2000 characters)')
         
         return sanitized
     
-    @validator('message_type')
+    @field_validator('message_type')
+    @classmethod
     def validate_message_type(cls, v):
         valid_types = ['text', 'voice', 'image', 'file']
         if v not in valid_types:
             raise ValueError(f'Invalid message type. Must be one of: {", ".join(valid_types)}')
         return v
     
-    @validator('conversation_id')
+    @field_validator('conversation_id')
+    @classmethod
     def validate_conversation_id(cls, v):
         if not v or not v.strip():
             raise ValueError('Conversation ID cannot be empty')
         # Basic UUID format validation
-        if not re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', v, re.IGNORECASE):
+        if not _is_uuid(v):
             raise ValueError('Invalid conversation ID format')
         return v
 
 
 class ConversationResponse(BaseModel):
     """Response model for conversation data"""
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     started_at: str
     last_message_at: str
@@ -238,6 +361,8 @@ class ConversationResponse(BaseModel):
 
 class MessageResponse(BaseModel):
     """Response model for message data"""
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     content: str
     sender: str
@@ -251,12 +376,13 @@ class MessageResponse(BaseModel):
 
 class MedicalConsultationRequest(BaseModel):
     """Request model for medical consultations"""
-    symptoms: List[str] = Field(..., min_items=1, max_items=10, description="List of symptoms")
+    symptoms: List[str] = Field(..., min_length=1, max_length=10, description="List of symptoms")
     duration: Optional[str] = Field(None, max_length=100, description="Duration of symptoms")
     severity: Optional[int] = Field(None, ge=1, le=10, description="Severity scale 1-10")
     additional_info: Optional[str] = Field(None, max_length=1000, description="Additional information")
     
-    @validator('symptoms')
+    @field_validator('symptoms')
+    @classmethod
     def validate_symptoms(cls, v):
         if v:
             sanitized_symptoms = []
@@ -268,13 +394,14 @@ class MedicalConsultationRequest(BaseModel):
             return sanitized_symptoms
         return []
     
-    @validator('additional_info')
+    @field_validator('additional_info')
+    @classmethod
     def validate_additional_info(cls, v):
         if v:
-            if not validate_no_sql_injection(v) or not validate_no_xss(v):
+            sanitized = _sanitize_request_text(v)
+            if sanitized is None:
                 raise ValueError('Additional info contains invalid characters')
             
-            sanitized = sanitize_text(v)
             if len(sanitized) > 1000:
                 raise ValueError('Additional info too long (max 1000 characters)')
             return sanitized
@@ -286,13 +413,14 @@ class DataExportRequest(BaseModel):
     date_range: Optional[Dict[str, str]] = Field(None, description="Date range for export")
     include_conversations: bool = Field(default=True, description="Include conversation data")
     
-    @validator('date_range')
+    @field_validator('date_range')
+    @classmethod
     def validate_date_range(cls, v):
         if v:
             # Validate date format if provided
             for key, value in v.items():
                 if key in ['start_date', 'end_date'] and isinstance(value, str):
                     # Basic date format validation
-                    if not re.match(r'^\d{4}-\d{2}-\d{2}$', value):
+                    if not _DATE_RE.match(value):
                         raise ValueError(f'Invalid date format for {key}. Use YYYY-MM-DD')
         return v
\ No newline at end of file
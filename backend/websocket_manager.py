@@ -3,11 +3,12 @@ WebSocket Manager for Real-time Chat Features
 Handles WebSocket connections, message broadcasting, and real-time updates
 """
 
-import json
 import logging
 import asyncio
+import orjson
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Dict, List, Set, Optional, Any
+from typing import DefaultDict, Dict, List, Set, Optional, Any
 from fastapi import WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 from models import User, Conversation, Message
@@ -16,28 +17,46 @@ from database import get_db
 logger = logging.getLogger(__name__)
 
 
+def _discard_member(index: Dict[str, Set[str]], key: str, member: str):
+    """Remove member from index[key], dropping the key once its set is empty"""
+    members = index.get(key)
+    if members is not None:
+        members.discard(member)
+        if not members:
+            del index[key]
+
+
 class ConnectionManager:
     """Manages WebSocket connections for real-time chat"""
     
     def __init__(self):
-        # Active connections: {user_id: {connection_id: websocket}}
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
-        # Conversation subscriptions: {conversation_id: {user_id: connection_ids}}
-        self.conversation_subscriptions: Dict[str, Dict[str, Set[str]]] = {}
+        # Connection tables keyed by connection_id, with reverse indexes so
+        # connection-level operations only touch that connection's entries
+        # WebSockets: {connection_id: websocket}
+        self.ws_by_conn: Dict[str, WebSocket] = {}
+        # Owning user: {connection_id: user_id}
+        self.conn_to_user: Dict[str, str] = {}
+        # User connections: {user_id: connection_ids}
+        self.user_to_conns: DefaultDict[str, Set[str]] = defaultdict(set)
+        # Subscribed conversations: {connection_id: conversation_ids}
+        self.conn_to_convs: DefaultDict[str, Set[str]] = defaultdict(set)
+        # Conversation subscribers: {conversation_id: connection_ids}
+        self.conv_to_conns: DefaultDict[str, Set[str]] = defaultdict(set)
         # Typing indicators: {conversation_id: {user_id: timestamp}}
-        self.typing_indicators: Dict[str, Dict[str, datetime]] = {}
+        self.typing_indicators: DefaultDict[str, Dict[str, datetime]] = defaultdict(dict)
+        # Conversations a user is typing in: {user_id: conversation_ids}
+        self.user_to_typing_convs: DefaultDict[str, Set[str]] = defaultdict(set)
         # Message delivery status: {message_id: {user_id: status}}
-        self.message_status: Dict[str, Dict[str, str]] = {}
+        self.message_status: DefaultDict[str, Dict[str, str]] = defaultdict(dict)
     
     async def connect(self, websocket: WebSocket, user_id: str, connection_id: str):
         """Accept a new WebSocket connection"""
         await websocket.accept()
         
         # Add to active connections
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = {}
-        
-        self.active_connections[user_id][connection_id] = websocket
+        self.ws_by_conn[connection_id] = websocket
+        self.conn_to_user[connection_id] = user_id
+        self.user_to_conns[user_id].add(connection_id)
         
         logger.info(f"WebSocket connected: user={user_id}, connection={connection_id}")
         
@@ -46,39 +65,23 @@ class ConnectionManager:
             "type": "connection_established",
             "user_id": user_id,
             "connection_id": connection_id,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": datetime.now(timezone.utc)
         }, websocket)
     
     def disconnect(self, user_id: str, connection_id: str):
         """Remove a WebSocket connection"""
         try:
-            if user_id in self.active_connections:
-                if connection_id in self.active_connections[user_id]:
-                    del self.active_connections[user_id][connection_id]
-                
-                # Clean up empty user entry
-                if not self.active_connections[user_id]:
-                    del self.active_connections[user_id]
+            self.ws_by_conn.pop(connection_id, None)
+            self.conn_to_user.pop(connection_id, None)
+            _discard_member(self.user_to_conns, user_id, connection_id)
             
-            # Remove from conversation subscriptions
-            for conv_id in list(self.conversation_subscriptions.keys()):
-                if user_id in self.conversation_subscriptions[conv_id]:
-                    if connection_id in self.conversation_subscriptions[conv_id][user_id]:
-                        self.conversation_subscriptions[conv_id][user_id].discard(connection_id)
-                    
-                    # Clean up empty entries
-                    if not self.conversation_subscriptions[conv_id][user_id]:
-                        del self.conversation_subscriptions[conv_id][user_id]
-                    
-                    if not self.conversation_subscriptions[conv_id]:
-                        del self.conversation_subscriptions[conv_id]
+            # Remove from the conversations this connection subscribed to
+            for conv_id in self.conn_to_convs.pop(connection_id, ()):
+                _discard_member(self.conv_to_conns, conv_id, connection_id)
             
             # Clear typing indicators
-            for conv_id in list(self.typing_indicators.keys()):
-                if user_id in self.typing_indicators[conv_id]:
-                    del self.typing_indicators[conv_id][user_id]
-                    if not self.typing_indicators[conv_id]:
-                        del self.typing_indicators[conv_id]
+            for conv_id in self.user_to_typing_convs.pop(user_id, ()):
+                self._remove_typing_user(conv_id, user_id)
             
             logger.info(f"WebSocket disconnected: user={user_id}, connection={connection_id}")
             
@@ -88,89 +91,77 @@ class ConnectionManager:
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to a specific WebSocket connection"""
         try:
-            await websocket.send_text(json.dumps(message))
+            await websocket.send_bytes(orjson.dumps(message))
         except Exception as e:
             logger.error(f"Failed to send personal message: {e}")
     
     async def send_to_user(self, message: dict, user_id: str):
         """Send message to all connections of a specific user"""
-        if user_id in self.active_connections:
-            disconnected_connections = []
+        if user_id in self.user_to_conns:
+            connection_ids = list(self.user_to_conns[user_id])
             
-            for connection_id, websocket in self.active_connections[user_id].items():
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Failed to send to user {user_id}, connection {connection_id}: {e}")
-                    disconnected_connections.append(connection_id)
+            # Serialize once and send to every connection of the user concurrently
+            payload = orjson.dumps(message)
+            results = await asyncio.gather(
+                *(self.ws_by_conn[connection_id].send_bytes(payload) for connection_id in connection_ids),
+                return_exceptions=True
+            )
             
             # Clean up disconnected connections
-            for connection_id in disconnected_connections:
-                self.disconnect(user_id, connection_id)
+            for connection_id, result in zip(connection_ids, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to send to user {user_id}, connection {connection_id}: {result}")
+                    self.disconnect(user_id, connection_id)
     
     async def subscribe_to_conversation(self, user_id: str, connection_id: str, conversation_id: str):
         """Subscribe a connection to conversation updates"""
-        if conversation_id not in self.conversation_subscriptions:
-            self.conversation_subscriptions[conversation_id] = {}
-        
-        if user_id not in self.conversation_subscriptions[conversation_id]:
-            self.conversation_subscriptions[conversation_id][user_id] = set()
-        
-        self.conversation_subscriptions[conversation_id][user_id].add(connection_id)
+        self.conv_to_conns[conversation_id].add(connection_id)
+        self.conn_to_convs[connection_id].add(conversation_id)
         
         logger.info(f"User {user_id} subscribed to conversation {conversation_id}")
     
     async def unsubscribe_from_conversation(self, user_id: str, connection_id: str, conversation_id: str):
         """Unsubscribe a connection from conversation updates"""
-        if (conversation_id in self.conversation_subscriptions and 
-            user_id in self.conversation_subscriptions[conversation_id]):
-            
-            self.conversation_subscriptions[conversation_id][user_id].discard(connection_id)
-            
-            # Clean up empty entries
-            if not self.conversation_subscriptions[conversation_id][user_id]:
-                del self.conversation_subscriptions[conversation_id][user_id]
-            
-            if not self.conversation_subscriptions[conversation_id]:
-                del self.conversation_subscriptions[conversation_id]
+        _discard_member(self.conv_to_conns, conversation_id, connection_id)
+        _discard_member(self.conn_to_convs, connection_id, conversation_id)
         
         logger.info(f"User {user_id} unsubscribed from conversation {conversation_id}")
     
     async def broadcast_to_conversation(self, message: dict, conversation_id: str, exclude_user: str = None):
         """Broadcast message to all subscribers of a conversation"""
-        if conversation_id not in self.conversation_subscriptions:
+        if conversation_id not in self.conv_to_conns:
             return
         
-        for user_id, connection_ids in self.conversation_subscriptions[conversation_id].items():
-            if exclude_user and user_id == exclude_user:
+        targets = []
+        for connection_id in self.conv_to_conns[conversation_id]:
+            user_id = self.conn_to_user.get(connection_id)
+            if user_id is None or (exclude_user and user_id == exclude_user):
                 continue
-            
-            if user_id in self.active_connections:
-                disconnected_connections = []
-                
-                for connection_id in connection_ids:
-                    if connection_id in self.active_connections[user_id]:
-                        try:
-                            websocket = self.active_connections[user_id][connection_id]
-                            await websocket.send_text(json.dumps(message))
-                        except Exception as e:
-                            logger.error(f"Failed to broadcast to {user_id}/{connection_id}: {e}")
-                            disconnected_connections.append(connection_id)
-                
-                # Clean up disconnected connections
-                for connection_id in disconnected_connections:
-                    self.disconnect(user_id, connection_id)
+            targets.append((user_id, connection_id, self.ws_by_conn[connection_id]))
+        
+        # Serialize once and fan the same payload out to every subscriber concurrently
+        payload = orjson.dumps(message)
+        results = await asyncio.gather(
+            *(websocket.send_bytes(payload) for _, _, websocket in targets),
+            return_exceptions=True
+        )
+        
+        # Clean up disconnected connections
+        for (user_id, connection_id, _), result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to broadcast to {user_id}/{connection_id}: {result}")
+                self.disconnect(user_id, connection_id)
     
     async def set_typing_indicator(self, user_id: str, conversation_id: str, is_typing: bool):
         """Set typing indicator for a user in a conversation"""
-        if conversation_id not in self.typing_indicators:
-            self.typing_indicators[conversation_id] = {}
+        now = datetime.now(timezone.utc)
         
         if is_typing:
-            self.typing_indicators[conversation_id][user_id] = datetime.now(timezone.utc)
+            self.typing_indicators[conversation_id][user_id] = now
+            self.user_to_typing_convs[user_id].add(conversation_id)
         else:
-            if user_id in self.typing_indicators[conversation_id]:
-                del self.typing_indicators[conversation_id][user_id]
+            self._remove_typing_user(conversation_id, user_id)
+            _discard_member(self.user_to_typing_convs, user_id, conversation_id)
         
         # Broadcast typing status to conversation subscribers
         await self.broadcast_to_conversation({
@@ -178,14 +169,19 @@ class ConnectionManager:
             "conversation_id": conversation_id,
             "user_id": user_id,
             "is_typing": is_typing,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": now
         }, conversation_id, exclude_user=user_id)
     
+    def _remove_typing_user(self, conversation_id: str, user_id: str):
+        """Remove a user's typing indicator, dropping the conversation once empty"""
+        typing_users = self.typing_indicators.get(conversation_id)
+        if typing_users is not None:
+            typing_users.pop(user_id, None)
+            if not typing_users:
+                del self.typing_indicators[conversation_id]
+    
     async def update_message_status(self, message_id: str, user_id: str, status: str):
         """Update message delivery/read status"""
-        if message_id not in self.message_status:
-            self.message_status[message_id] = {}
-        
         self.message_status[message_id][user_id] = status
         
         # Broadcast status update
@@ -193,7 +189,7 @@ class ConnectionManager:
             "type": "message_status_update",
             "message_id": message_id,
             "status": status,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": datetime.now(timezone.utc)
         }, user_id)
     
     async def broadcast_new_message(self, message: Message, conversation_id: str):
@@ -205,14 +201,14 @@ class ConnectionManager:
                 "id": message.id,
                 "content": message.content,
                 "sender": message.sender,
-                "timestamp": message.timestamp.isoformat(),
+                "timestamp": message.timestamp,
                 "sequence_number": message.sequence_number,
                 "ai_model": message.ai_model,
                 "confidence_score": message.confidence_score,
                 "emergency_flag": message.emergency_flag or False,
                 "medical_analysis": message.medical_analysis
             },
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": datetime.now(timezone.utc)
         }
         
         await self.broadcast_to_conversation(message_data, conversation_id)
@@ -224,25 +220,37 @@ class ConnectionManager:
             "conversation": {
                 "id": conversation.id,
                 "status": conversation.status,
-                "last_message_at": conversation.last_message_at.isoformat(),
+                "last_message_at": conversation.last_message_at,
                 "urgency_level": conversation.urgency_level,
                 "emergency_detected": conversation.emergency_detected or False,
                 "crisis_level": conversation.crisis_level,
                 "total_messages": conversation.total_messages or 0
             },
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": datetime.now(timezone.utc)
         }
         
         await self.broadcast_to_conversation(update_data, conversation.id)
     
     def get_active_users(self) -> List[str]:
         """Get list of currently active user IDs"""
-        return list(self.active_connections.keys())
+        return list(self.user_to_conns.keys())
+    
+    def get_connection_count(self) -> int:
+        """Get number of open WebSocket connections"""
+        return len(self.ws_by_conn)
+    
+    def get_active_conversations(self) -> List[str]:
+        """Get list of conversations with at least one subscriber"""
+        return list(self.conv_to_conns.keys())
     
     def get_conversation_subscribers(self, conversation_id: str) -> List[str]:
         """Get list of users subscribed to a conversation"""
-        if conversation_id in self.conversation_subscriptions:
-            return list(self.conversation_subscriptions[conversation_id].keys())
+        if conversation_id in self.conv_to_conns:
+            return list(dict.fromkeys(
+                self.conn_to_user[connection_id]
+                for connection_id in self.conv_to_conns[conversation_id]
+                if connection_id in self.conn_to_user
+            ))
         return []
     
     async def cleanup_stale_typing_indicators(self):
@@ -250,25 +258,31 @@ class ConnectionManager:
         current_time = datetime.now(timezone.utc)
         stale_threshold = 30  # seconds
         
-        for conv_id in list(self.typing_indicators.keys()):
-            for user_id in list(self.typing_indicators[conv_id].keys()):
-                last_typing = self.typing_indicators[conv_id][user_id]
+        # Remove every stale indicator before awaiting any broadcast, so sends
+        # (and the disconnects they may trigger) never race this sweep
+        stale_indicators = []
+        for conv_id, typing_users in list(self.typing_indicators.items()):
+            for user_id, last_typing in list(typing_users.items()):
                 if (current_time - last_typing).total_seconds() > stale_threshold:
-                    # Remove stale typing indicator
-                    del self.typing_indicators[conv_id][user_id]
-                    
-                    # Broadcast typing stopped
-                    await self.broadcast_to_conversation({
-                        "type": "typing_indicator",
-                        "conversation_id": conv_id,
-                        "user_id": user_id,
-                        "is_typing": False,
-                        "timestamp": current_time.isoformat()
-                    }, conv_id, exclude_user=user_id)
+                    del typing_users[user_id]
+                    _discard_member(self.user_to_typing_convs, user_id, conv_id)
+                    stale_indicators.append((conv_id, user_id))
             
             # Clean up empty conversation entries
-            if not self.typing_indicators[conv_id]:
+            if not typing_users:
                 del self.typing_indicators[conv_id]
+        
+        # Broadcast typing stopped
+        await asyncio.gather(*(
+            self.broadcast_to_conversation({
+                "type": "typing_indicator",
+                "conversation_id": conv_id,
+                "user_id": user_id,
+                "is_typing": False,
+                "timestamp": current_time
+            }, conv_id, exclude_user=user_id)
+            for conv_id, user_id in stale_indicators
+        ))
 
 
 # Global connection manager instance
@@ -312,7 +326,7 @@ async def handle_websocket_message(websocket: WebSocket, user_id: str, connectio
         elif message_type == "ping":
             await connection_manager.send_personal_message({
                 "type": "pong",
-                "timestamp": datetime.now(timezone.utc).isoformat()
+                "timestamp": datetime.now(timezone.utc)
             }, websocket)
         
         else:
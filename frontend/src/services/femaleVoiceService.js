@@ -3,11 +3,65 @@
  * Provides sweet, natural female voice using free TTS models
  */
 
+// Build a single alternation regex plus a replacement lookup for a phrase table,
+// so each text-processing stage is one pass over the text instead of one per phrase
+const compilePhraseTable = (phrases, { wordBoundary = true, ignoreCase = true } = {}) => {
+  const escape = (phrase) => phrase.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+  const alternation = Object.keys(phrases).map(escape).join('|');
+  const source = wordBoundary ? `\\b(?:${alternation})\\b` : alternation;
+  const lookup = new Map(
+    Object.entries(phrases).map(([phrase, replacement]) => [
+      ignoreCase ? phrase.toLowerCase() : phrase,
+      replacement
+    ])
+  );
+
+  return {
+    pattern: new RegExp(source, ignoreCase ? 'gi' : 'g'),
+    replace: (match) => lookup.get(ignoreCase ? match.toLowerCase() : match)
+  };
+};
+
+// Synthesized clips kept for repeated phrases (greetings, voice tests)
+const AUDIO_CACHE_MAX_ENTRIES = 32;
+
+// Add caring expressions for medical context
+const CARING_PHRASES = compilePhraseTable({
+  'Hello': 'Hello there',
+  'Hi': 'Hi there',
+  'I understand': 'I completely understand',
+  'That sounds': 'That sounds concerning',
+  'You should': 'I would recommend that you',
+  'Take care': 'Please take good care of yourself',
+  'Feel better': 'I hope you feel better soon'
+});
+
+// Add gentle pauses for a more caring delivery
+const GENTLE_PAUSES = compilePhraseTable({
+  '. ': '. ... ',
+  '? ': '? ... ',
+  '! ': '! ... ',
+  'However,': '... However,',
+  'Additionally,': '... Additionally,',
+  'Important:': '... This is important: ...'
+}, { wordBoundary: false, ignoreCase: false });
+
+// Soften medical terminology
+const MEDICAL_SOFTENING = compilePhraseTable({
+  'diagnosis': 'medical assessment',
+  'symptoms': 'what you\'re experiencing',
+  'condition': 'health situation',
+  'treatment': 'care plan',
+  'medication': 'medicine',
+  'side effects': 'possible reactions'
+});
+
 class FemaleVoiceService {
   constructor() {
     this.isInitialized = false;
     this.audioContext = null;
     this.currentAudio = null;
+    this.audioCache = new Map();
     this.voiceSettings = {
       model: 'jenny', // Sweet female voice
       speed: 0.9,
@@ -52,19 +106,35 @@ class FemaleVoiceService {
       }
     };
     
-    this.init();
+    // Saved settings are read eagerly for the settings UI; the audio context
+    // and TTS server probe are deferred until the first utterance
+    this.initPromise = null;
+    this.loadSettings();
   }
 
-  async init() {
+  loadSettings() {
     try {
-      // Initialize audio context
-      this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
-      
-      // Load voice settings from localStorage
       const savedSettings = localStorage.getItem('mydoc-female-voice-settings');
       if (savedSettings) {
         this.voiceSettings = { ...this.voiceSettings, ...JSON.parse(savedSettings) };
       }
+    } catch (error) {
+      console.error('Failed to load female voice settings:', error);
+    }
+  }
+
+  init() {
+    // Share one in-flight initialization between concurrent callers
+    if (!this.initPromise) {
+      this.initPromise = this.startServices();
+    }
+    return this.initPromise;
+  }
+
+  async startServices() {
+    try {
+      // Initialize audio context
+      this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
       
       // Test available TTS services
       await this.detectAvailableServices();
@@ -75,6 +145,7 @@ class FemaleVoiceService {
     } catch (error) {
       console.error('Failed to initialize Female Voice Service:', error);
       this.isInitialized = false;
+      this.initPromise = null;
     }
   }
 
@@ -133,6 +204,15 @@ class FemaleVoiceService {
   async speakWithLocalTTS(text, settings) {
     try {
       const voice = this.femaleVoices[settings.model] || this.femaleVoices.jenny;
+      const cacheKey = JSON.stringify([text, voice.model, voice.speaker || null, settings.speed, settings.pitch]);
+      
+      const cachedBlob = this.audioCache.get(cacheKey);
+      if (cachedBlob) {
+        // Refresh recency so the map's insertion order stays least-recently-used first
+        this.audioCache.delete(cacheKey);
+        this.audioCache.set(cacheKey, cachedBlob);
+        return await this.playAudioBlob(cachedBlob);
+      }
       
       const requestBody = {
         text: text,
@@ -158,6 +238,10 @@ class FemaleVoiceService {
       }
 
       const audioBlob = await response.blob();
+      this.audioCache.set(cacheKey, audioBlob);
+      if (this.audioCache.size > AUDIO_CACHE_MAX_ENTRIES) {
+        this.audioCache.delete(this.audioCache.keys().next().value);
+      }
       return await this.playAudioBlob(audioBlob);
       
     } catch (error) {
@@ -256,49 +340,10 @@ class FemaleVoiceService {
   }
 
   processTextForFemaleVoice(text) {
-    let processedText = text;
-
-    // Add caring expressions for medical context
-    const caringPhrases = {
-      'Hello': 'Hello there',
-      'Hi': 'Hi there',
-      'I understand': 'I completely understand',
-      'That sounds': 'That sounds concerning',
-      'You should': 'I would recommend that you',
-      'Take care': 'Please take good care of yourself',
-      'Feel better': 'I hope you feel better soon'
-    };
-
-    Object.entries(caringPhrases).forEach(([original, caring]) => {
-      const regex = new RegExp(`\\b${original}\\b`, 'gi');
-      processedText = processedText.replace(regex, caring);
-    });
-
-    // Add gentle pauses for a more caring delivery
-    processedText = processedText
-      .replace(/\. /g, '. ... ')
-      .replace(/\? /g, '? ... ')
-      .replace(/! /g, '! ... ')
-      .replace(/However,/g, '... However,')
-      .replace(/Additionally,/g, '... Additionally,')
-      .replace(/Important:/g, '... This is important: ...');
-
-    // Soften medical terminology
-    const medicalSoftening = {
-      'diagnosis': 'medical assessment',
-      'symptoms': 'what you\'re experiencing',
-      'condition': 'health situation',
-      'treatment': 'care plan',
-      'medication': 'medicine',
-      'side effects': 'possible reactions'
-    };
-
-    Object.entries(medicalSoftening).forEach(([medical, gentle]) => {
-      const regex = new RegExp(`\\b${medical}\\b`, 'gi');
-      processedText = processedText.replace(regex, gentle);
-    });
-
-    return processedText;
+    return [CARING_PHRASES, GENTLE_PAUSES, MEDICAL_SOFTENING].reduce(
+      (processedText, { pattern, replace }) => processedText.replace(pattern, replace),
+      text
+    );
   }
 
   async playAudioBlob(audioBlob) {
@@ -3,6 +3,9 @@
  * Handles WebSocket connections, message broadcasting, and real-time updates
  */
 
+// The server sends JSON as UTF-8 binary frames
+const textDecoder = new TextDecoder();
+
 class WebSocketService {
   constructor() {
     this.ws = null;
@@ -38,6 +41,7 @@ class WebSocketService {
     return new Promise((resolve, reject) => {
       try {
         this.ws = new WebSocket(fullUrl);
+        this.ws.binaryType = 'arraybuffer';
 
         this.ws.onopen = () => {
           console.log('WebSocket connected successfully');
@@ -52,7 +56,8 @@ class WebSocketService {
 
         this.ws.onmessage = (event) => {
           try {
-            const data = JSON.parse(event.data);
+            const text = typeof event.data === 'string' ? event.data : textDecoder.decode(event.data);
+            const data = JSON.parse(text);
             this.handleMessage(data);
           } catch (error) {
             console.error('Failed to parse WebSocket message:', error);
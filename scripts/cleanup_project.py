@@ -6,49 +6,62 @@ Removes temporary files, optimizes imports, and ensures clean codebase
 
 import os
 import shutil
-import glob
+import time
 from pathlib import Path
 
+# Directories never descended into while scanning the project tree
+SKIP_DIRS = {'node_modules', '.git', '.venv', 'venv', 'dist', 'build', '__pycache__'}
+
+def scan_tree(root='.'):
+    """Yield every directory entry under root, pruning SKIP_DIRS"""
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    yield entry
+                    if entry.name not in SKIP_DIRS and entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError:
+            continue
+
 def cleanup_pycache():
     """Remove Python cache files"""
     print("🧹 Cleaning Python cache files...")
-    for root, dirs, files in os.walk('.'):
-        for dir_name in dirs:
-            if dir_name == '__pycache__':
-                cache_path = os.path.join(root, dir_name)
-                print(f"  Removing: {cache_path}")
-                shutil.rmtree(cache_path, ignore_errors=True)
+    for entry in scan_tree('.'):
+        if entry.name == '__pycache__' and entry.is_dir(follow_symlinks=False):
+            print(f"  Removing: {entry.path}")
+            shutil.rmtree(entry.path, ignore_errors=True)
 
 def cleanup_temp_files():
     """Remove temporary files"""
     print("🧹 Cleaning temporary files...")
-    temp_patterns = [
-        '**/*.tmp',
-        '**/*.temp',
-        '**/*.bak',
-        '**/*.backup',
-        '**/*~',
-        '**/.DS_Store'
-    ]
+    temp_suffixes = ('.tmp', '.temp', '.bak', '.backup', '~')
+    temp_names = {'.DS_Store'}
     
-    for pattern in temp_patterns:
-        for file_path in glob.glob(pattern, recursive=True):
-            print(f"  Removing: {file_path}")
+    for entry in scan_tree('.'):
+        name = entry.name
+        if (name.endswith(temp_suffixes) or name in temp_names) and entry.is_file(follow_symlinks=False):
+            print(f"  Removing: {entry.path}")
             try:
-                os.remove(file_path)
+                os.remove(entry.path)
             except OSError:
                 pass
 
 def cleanup_logs():
     """Clean old log files"""
     print("🧹 Cleaning old log files...")
-    log_dir = Path('logs')
-    if log_dir.exists():
-        for log_file in log_dir.glob('*.log'):
-            # Keep recent logs (last 7 days)
-            if log_file.stat().st_mtime < (os.path.getmtime('.') - 7 * 24 * 3600):
-                print(f"  Removing old log: {log_file}")
-                log_file.unlink()
+    # Keep recent logs (last 7 days)
+    cutoff = time.time() - 7 * 24 * 3600
+    try:
+        entries = os.scandir('logs')
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.name.endswith('.log') and entry.stat().st_mtime < cutoff:
+                print(f"  Removing old log: {entry.path}")
+                os.unlink(entry.path)
 
 def cleanup_node_modules():
     """Clean and reinstall node modules if needed"""
@@ -73,24 +86,37 @@ def optimize_database():
     
     # Move any database files from backend to data
     backend_dir = Path('backend')
-    for db_file in backend_dir.glob('*.db*'):
-        target = data_dir / db_file.name
-        if not target.exists():
-            shutil.move(str(db_file), str(target))
-            print(f"  Moved database file: {db_file.name}")
+    if not backend_dir.is_dir():
+        return
+    with os.scandir(backend_dir) as entries:
+        for entry in entries:
+            if '.db' not in entry.name or not entry.is_file():
+                continue
+            target = data_dir / entry.name
+            if not target.exists():
+                try:
+                    # Atomic rename on the same filesystem
+                    os.replace(entry.path, target)
+                except OSError:
+                    # e.g. data/ is on another device; fall back to copy + delete
+                    shutil.move(entry.path, str(target))
+                print(f"  Moved database file: {entry.name}")
 
 def verify_gitignore():
     """Verify .gitignore is comprehensive"""
     print("🧹 Verifying .gitignore...")
     gitignore_path = Path('.gitignore')
     if gitignore_path.exists():
-        content = gitignore_path.read_text()
+        entries = {
+            line.strip() for line in gitignore_path.read_text().splitlines()
+            if line.strip() and not line.lstrip().startswith('#')
+        }
         required_patterns = [
             '*.db', '*.sqlite', '__pycache__/', 'node_modules/',
             '.env', '*.log', 'dist/', 'build/'
         ]
         
-        missing = [pattern for pattern in required_patterns if pattern not in content]
+        missing = [pattern for pattern in required_patterns if pattern not in entries]
         if missing:
             print(f"  Missing patterns in .gitignore: {missing}")
         else:
@@ -3,6 +3,8 @@
 # Blue-Green Deployment Script
 set -e
 
+source "$(dirname "${BASH_SOURCE[0]}")/lib/health.sh"
+
 ENVIRONMENT=${1:-staging}
 VERSION=${2:-latest}
 HEALTH_CHECK_TIMEOUT=300
@@ -26,26 +28,18 @@ get_active_environment() {
     fi
 }
 
-# Health check function
+# Health check function (polls the backend until it responds or HEALTH_CHECK_TIMEOUT expires)
 health_check() {
     local env=$1
-    local max_attempts=$((HEALTH_CHECK_TIMEOUT / 10))
-    local attempt=1
     
     echo "Performing health check for $env environment..."
     
-    while [ $attempt -le $max_attempts ]; do
-        if curl -f -s "http://localhost:8000/health" > /dev/null 2>&1; then
-            echo "Health check passed for $env environment"
-            return 0
-        fi
-        
-        echo "Health check attempt $attempt/$max_attempts failed, retrying in 10 seconds..."
-        sleep 10
-        ((attempt++))
-    done
+    if wait_for_health "http://localhost:8000/health" $HEALTH_CHECK_TIMEOUT; then
+        echo "Health check passed for $env environment"
+        return 0
+    fi
     
-    echo "Health check failed for $env environment after $max_attempts attempts"
+    echo "Health check failed for $env environment"
     return 1
 }
 
@@ -87,10 +81,7 @@ main() {
     echo "Starting deployment to $inactive_env environment..."
     docker-compose -f docker-compose.$ENVIRONMENT.yml up -d $inactive_env-backend $inactive_env-frontend
     
-    # Wait for services to start
-    sleep 30
-    
-    # Perform health check
+    # Perform health check (polls until the new services are up)
     if health_check $inactive_env; then
         echo "Health check passed, switching traffic to $inactive_env environment..."
         
@@ -3,9 +3,12 @@
 # Kubernetes Deployment Script
 set -e
 
+source "$(dirname "${BASH_SOURCE[0]}")/lib/health.sh"
+
 ENVIRONMENT=${1:-staging}
 NAMESPACE="mydoc-$ENVIRONMENT"
 KUBECTL_TIMEOUT=300
+HEALTH_CHECK_TIMEOUT=330
 
 echo "Deploying to Kubernetes $ENVIRONMENT environment..."
 
@@ -88,7 +91,6 @@ kubectl get ingress -n $NAMESPACE
 
 # Health check
 echo "Performing health check..."
-sleep 30
 
 if [[ "$ENVIRONMENT" == "staging" ]]; then
     HEALTH_URL="https://staging.mydoc.app/api/health"
@@ -97,20 +99,11 @@ else
 fi
 
 # Wait for health check to pass
-for i in {1..10}; do
-    if curl -f -s "$HEALTH_URL" > /dev/null 2>&1; then
-        echo "Health check passed!"
-        break
-    else
-        echo "Health check attempt $i/10 failed, retrying in 30 seconds..."
-        sleep 30
-    fi
-    
-    if [ $i -eq 10 ]; then
-        echo "Health check failed after 10 attempts"
-        exit 1
-    fi
-done
+if wait_for_health "$HEALTH_URL" $HEALTH_CHECK_TIMEOUT; then
+    echo "Health check passed!"
+else
+    exit 1
+fi
 
 echo "Deployment to $ENVIRONMENT completed successfully!"
 
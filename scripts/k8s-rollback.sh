@@ -3,8 +3,11 @@
 # Kubernetes Rollback Script
 set -e
 
+source "$(dirname "${BASH_SOURCE[0]}")/lib/health.sh"
+
 ENVIRONMENT=${1:-staging}
 NAMESPACE="mydoc-$ENVIRONMENT"
+HEALTH_CHECK_TIMEOUT=60
 
 echo "Rolling back Kubernetes deployment in $ENVIRONMENT environment..."
 
@@ -57,7 +60,6 @@ kubectl get pods -n $NAMESPACE
 
 # Health check
 echo "Performing health check after rollback..."
-sleep 30
 
 if [[ "$ENVIRONMENT" == "staging" ]]; then
     HEALTH_URL="https://staging.mydoc.app/api/health"
@@ -65,7 +67,7 @@ else
     HEALTH_URL="https://mydoc.app/api/health"
 fi
 
-if curl -f -s "$HEALTH_URL" > /dev/null 2>&1; then
+if wait_for_health "$HEALTH_URL" $HEALTH_CHECK_TIMEOUT; then
     echo "Health check passed after rollback!"
 else
     echo "Warning: Health check failed after rollback"
@@ -0,0 +1,26 @@
+#!/bin/bash
+
+# Shared health check helper, sourced by the deploy and rollback scripts
+
+HEALTH_CHECK_REQUEST_TIMEOUT=10
+HEALTH_CHECK_MAX_INTERVAL=30
+
+# Poll a health URL with exponential backoff until it responds or the timeout expires
+wait_for_health() {
+    local url=$1
+    local timeout=$2
+    local deadline=$((SECONDS + timeout))
+    local delay=1
+    local attempt=1
+    
+    until curl -f -s --max-time $HEALTH_CHECK_REQUEST_TIMEOUT "$url" > /dev/null 2>&1; do
+        if [ $((SECONDS + delay)) -gt $deadline ]; then
+            echo "Health check failed after $attempt attempts"
+            return 1
+        fi
+        echo "Health check attempt $attempt failed, retrying in $delay seconds..."
+        sleep $delay
+        delay=$((delay * 2 > HEALTH_CHECK_MAX_INTERVAL ? HEALTH_CHECK_MAX_INTERVAL : delay * 2))
+        attempt=$((attempt + 1))
+    done
+}
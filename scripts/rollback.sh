@@ -3,8 +3,11 @@
 # Rollback Script for Blue-Green Deployment
 set -e
 
+source "$(dirname "${BASH_SOURCE[0]}")/lib/health.sh"
+
 ENVIRONMENT=${1:-staging}
 TARGET_VERSION=${2:-previous}
+HEALTH_CHECK_TIMEOUT=60
 
 echo "Starting rollback for $ENVIRONMENT environment..."
 
@@ -40,8 +43,7 @@ rollback_to_previous() {
     docker-compose -f docker-compose.$ENVIRONMENT.yml up -d
     
     # Health check
-    sleep 30
-    if curl -f -s "http://localhost:8000/health" > /dev/null 2>&1; then
+    if wait_for_health "http://localhost:8000/health" $HEALTH_CHECK_TIMEOUT; then
         echo "Rollback completed successfully!"
         echo "Previous version is now active"
     else